@@ -0,0 +1,55 @@
+"""
+Compares an `AutoScaled` code object against the same object behind a `wrapt.ObjectProxy`, the
+way `AutoScaled` used to wrap mobjects, while stepping through `HighlightLines` animations frame
+by frame like a scene does.
+
+    python benchmarks/autoscale.py [path] [--frames 60] [--repeat 5]
+"""
+import argparse
+import os
+import timeit
+
+from manim import config
+from manim import Mobject
+from wrapt import ObjectProxy
+
+from code_video import AutoScaled
+from code_video import HighlightLines
+from code_video import PartialCode
+
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), "..", "code_video", "scene.py")
+
+
+def play(code: Mobject, frames: int):
+    for start, end in ((1, 10), (1, -1)):
+        animation = HighlightLines(code, start, end)
+        animation.begin()
+        for frame in range(1, frames + 1):
+            animation.interpolate(frame / frames)
+            animation.update_mobjects(1 / config.frame_rate)
+            # the camera walks the family of every moving mobject to render a frame
+            code.family_members_with_points()
+        animation.finish()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path", nargs="?", default=DEFAULT_PATH, help="The source file to highlight")
+    parser.add_argument("--frames", type=int, default=60, help="The frames per animation")
+    parser.add_argument("--repeat", type=int, default=5, help="The number of timed runs, the best is kept")
+    args = parser.parse_args()
+
+    results = {}
+    for name, code in (
+        ("wrapt proxy", ObjectProxy(PartialCode(path=args.path))),
+        ("mixin", AutoScaled(PartialCode(path=args.path))),
+    ):
+        best = min(timeit.repeat(lambda: play(code, args.frames), number=1, repeat=args.repeat))
+        results[name] = best
+        print(f"{name:>12}: {best * 1000:8.1f} ms, {best * 1000 / (args.frames * 2):6.2f} ms per frame")
+
+    print(f"{'speedup':>12}: {results['wrapt proxy'] / results['mixin']:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
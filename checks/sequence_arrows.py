@@ -0,0 +1,60 @@
+"""
+Checks that the arrows of an autoscaled sequence diagram end on their actors' lifelines, both when
+the interactions are built up front and when a paged diagram builds them after it was scaled.
+
+    python checks/sequence_arrows.py
+"""
+import sys
+
+from manim import DOWN
+from manim import np
+from manim import Text
+from manim import UP
+
+from code_video import AutoScaled
+from code_video import SequenceDiagram
+from code_video.sequence import ActorArrow
+
+
+def build(page_height=None):
+    diagram = AutoScaled(SequenceDiagram(page_height=page_height))
+    browser, web, app, db, cache = diagram.add_objects("Browser", "Web", "App", "Database", "Cache")
+    browser.to(web, "Make a request")
+    web.to(app, "Do a quick thing")
+    app.to(db, "Query")
+    db.to(app, "Rows")
+    app.to(app, "Call itself")
+    app.note("Do lots of thinking")
+    app.to(cache, "Store")
+    app.to(web, "Value from db")
+    web.to(browser, "HTML response")
+
+    title = Text("Sequence Diagram").to_edge(UP)
+    diagram.next_to(title, DOWN)
+    return diagram
+
+
+def check(name, interactions):
+    failures = 0
+    for interaction in interactions:
+        if not isinstance(interaction, ActorArrow):
+            continue
+        line = interaction.submobjects[0]
+        start, end = line.points[0][0], line.tip.tip_point[0]
+        for point, actor in ((start, interaction.source), (end, interaction.target)):
+            if not np.isclose(point, actor.get_center()[0], atol=1e-3):
+                print(f"{name}: {interaction} ends at {point:.3f}, not at {actor} x {actor.get_center()[0]:.3f}")
+                failures += 1
+    return failures
+
+
+def main():
+    failures = check("not paged", build().get_interactions())
+    failures += check("paged", [interaction for page in build(page_height=2).get_pages() for interaction in page])
+    if failures:
+        sys.exit(1)
+    print("All arrows end on their lifelines")
+
+
+if __name__ == "__main__":
+    main()
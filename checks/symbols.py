@@ -0,0 +1,87 @@
+"""
+Checks that functions, classes and methods are found by name in languages whose Pygments lexer
+doesn't mark definitions, like JavaScript, TypeScript and Go.
+
+    python checks/symbols.py
+"""
+import os
+import sys
+import tempfile
+
+from code_video.cache import CACHE_DIR_ENV
+from code_video.symbols import index_symbols
+
+SOURCES = {
+    "greeter.js": (
+        """\
+class Greeter {
+  greet(name) {
+    return "Hello " + name;
+  }
+}
+
+function add(a, b) {
+  return a + b;
+}
+""",
+        {"Greeter": (1, 5), "add": (7, 9)},
+    ),
+    "shapes.ts": (
+        """\
+interface Shape {
+  area(): number;
+}
+
+export class Square implements Shape {
+  side = 1;
+}
+
+export function total(shapes: Shape[]): number {
+  return shapes.length;
+}
+""",
+        {"Shape": (1, 3), "Square": (5, 7), "total": (9, 11)},
+    ),
+    "point.go": (
+        """\
+package main
+
+type Point struct {
+	X int
+}
+
+func (p *Point) Area() int {
+	return 0
+}
+
+func handler(w http.ResponseWriter) http.Handler {
+	check := func(err error) bool {
+		return err != nil
+	}
+	return nil
+}
+""",
+        {"Point": (3, 5), "Area": (7, 9), "handler": (11, 16)},
+    ),
+}
+
+
+def main():
+    failures = 0
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ[CACHE_DIR_ENV] = os.path.join(directory, "cache")
+        for name, (source, expected) in SOURCES.items():
+            path = os.path.join(directory, name)
+            with open(path, "w") as f:
+                f.write(source)
+            symbols = index_symbols(path)
+            if symbols != expected:
+                print(f"{name}: found {symbols}, expected {expected}")
+                failures += 1
+    if failures:
+        sys.exit(1)
+    print("All symbols found")
+
+
+if __name__ == "__main__":
+    main()
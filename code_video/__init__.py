@@ -1,10 +1,41 @@
-from .autoscale import AutoScaled  # noqa
-from .code_walkthrough import *  # noqa
-from .layout import ColumnLayout  # noqa
-from .scene import CodeScene  # noqa
-from .sequence import Actor  # noqa
-from .sequence import Interaction  # noqa
-from .sequence import SequenceDiagram  # noqa
-from .widgets import Connection  # noqa
-from .widgets import NoteBox  # noqa
-from .widgets import TextBox  # noqa
+import importlib
+
+# Public names are imported on first access so that `import code_video` stays cheap
+_EXPORTS = {
+    "AutoScaled": ".autoscale",
+    "CodeViewport": ".code_walkthrough",
+    "HighlightLine": ".code_walkthrough",
+    "HighlightLines": ".code_walkthrough",
+    "HighlightNone": ".code_walkthrough",
+    "PartialCode": ".code_walkthrough",
+    "TransformCode": ".code_walkthrough",
+    "ColumnLayout": ".layout",
+    "load_manifest": ".manifest",
+    "Manifest": ".manifest",
+    "GridLayout": ".layout",
+    "CodeScene": ".scene",
+    "Actor": ".sequence",
+    "Interaction": ".sequence",
+    "SequenceDiagram": ".sequence",
+    "find_symbol": ".symbols",
+    "load_trace": ".trace",
+    "Connection": ".widgets",
+    "Diagram": ".widgets",
+    "NoteBox": ".widgets",
+    "TextBox": ".widgets",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -1,43 +1,75 @@
-from dataclasses import dataclass
-from typing import Tuple
+from functools import lru_cache
+from typing import Optional
 
 from manim import config
 from manim import DEFAULT_MOBJECT_TO_EDGE_BUFFER
 from manim import DEFAULT_MOBJECT_TO_MOBJECT_BUFFER
-from manim import DOWN
 from manim import LEFT
 from manim import Mobject
 from manim import np
 from manim import ORIGIN
-from manim import Polygon
 from manim import RIGHT
-from manim import UP
-from wrapt import ObjectProxy
 
 
 WIDTH_THIRD = (config["frame_x_radius"] * 2) / 3
 
 
-@dataclass
 class Bounds:
-    ul: Tuple[float, float, float] = None
-    ur: Tuple[float, float, float] = None
-    dr: Tuple[float, float, float] = None
-    dl: Tuple[float, float, float] = None
+    """
+    An axis aligned bounding box, stored as a `[min, max]` array of points
+    """
+
+    def __init__(self, box: Optional[np.ndarray] = None):
+        self.box = np.zeros((2, 3)) if box is None else np.array(box, dtype=float)
 
     @property
     def width(self):
-        return abs(self.ul[0] - self.ur[0])
+        return self.box[1, 0] - self.box[0, 0]
 
     @property
     def height(self):
-        return abs(self.ur[1] - self.dr[1])
+        return self.box[1, 1] - self.box[0, 1]
+
+    def get_critical_point(self, direction: np.array) -> np.ndarray:
+        """
+        Gets a corner, edge center or center of the box, like `Mobject.get_critical_point`
+        """
+        return self.box[0] + (np.asarray(direction) + 1) / 2 * (self.box[1] - self.box[0])
 
-    def as_mobject(self) -> Polygon:
-        return Polygon(self.ul, self.ur, self.dr, self.dl)
+    def scale(self, scale_factor: float, about_point: np.ndarray):
+        self.box = about_point + (self.box - about_point) * scale_factor
+
+    def copy_sides(self, direction: np.array, other: "Bounds"):
+        """
+        Moves the sides facing the given direction to those of another box
+        """
+        for dim in (0, 1):
+            if direction[dim] == -1:
+                self.box[0, dim] = other.box[0, dim]
+            elif direction[dim] == 1:
+                self.box[1, dim] = other.box[1, dim]
 
 
-class AutoScaled(ObjectProxy):
+def get_bounds(mobject: Mobject) -> Bounds:
+    """
+    Gets the bounding box of a mobject, reducing the points of each family member in place instead of
+    merging them into one array first
+    """
+    members = mobject.family_members_with_points()
+    if not members:
+        center = mobject.get_center()
+        return Bounds(np.array((center, center)))
+    return Bounds(
+        np.array(
+            (
+                np.min([member.points.min(axis=0) for member in members], axis=0),
+                np.max([member.points.max(axis=0) for member in members], axis=0),
+            )
+        )
+    )
+
+
+class AutoScaled:
     """
     Autoscales whatever it wraps on changes in placement including:
     * `next_to`
@@ -45,51 +77,62 @@ class AutoScaled(ObjectProxy):
     * `set_x`
     * `set_y`
     * `move_to`
+
+    Wrapping doesn't create a new object. The mobject's class is switched to a subclass mixing in
+    the autoscaling, so `AutoScaled(code)` returns `code` itself and manim sees a plain mobject.
     """
 
+    def __new__(cls, delegate: Optional[Mobject] = None, rescale: bool = True):
+        if delegate is None:
+            # copies and unpickling start from an empty instance and fill in its attributes
+            return super().__new__(cls)
+        if not isinstance(delegate, AutoScaled):
+            delegate.__class__ = _autoscaled_class(type(delegate))
+        return delegate
+
     def __init__(self, delegate: Mobject, rescale: bool = True):
         """
         Args:
             delegate: The object to scale
             rescale: Whether to rescale the object immediately or not
         """
-        super().__init__(delegate)
         self._overall_scale_factor: float = 1
         self._bounds = Bounds()
+        self._mobject_bounds: Optional[Bounds] = None
         self.reset_bounds()
         if rescale:
             self.autoscale(ORIGIN)
 
+    def __reduce__(self):
+        # the mixed in class is created at runtime, so it can't be pickled by name
+        return _new_autoscaled, (_autoscaled_base(type(self)),), self.__dict__
+
     def scale(self, scale_factor, **kwargs):
         self._overall_scale_factor *= scale_factor
-        self.__wrapped__.scale(scale_factor, **kwargs)
-        return self
+        return super().scale(scale_factor, **kwargs)
 
     def copy(self):
-        result = self.__wrapped__.copy()
-        wrapper = AutoScaled(result, False)
-        wrapper._bounds = self._bounds
-        wrapper._overall_scale_factor = self._overall_scale_factor
-        return wrapper
+        result = super().copy()
+        # placing a copy, like an animation target, still fills the same bounds
+        result._bounds = self._bounds
+        result._mobject_bounds = None
+        return result
 
     def next_to(self, mobject_or_point, direction=RIGHT, **kwargs):
-        self.__wrapped__.next_to(mobject_or_point, direction, **kwargs)
-        self._update_bounds_to_direction(direction * -1)
-        self.autoscale(direction * -1)
+        super().next_to(mobject_or_point, direction, **kwargs)
+        self._placed(direction * -1)
 
         return self
 
     def move_to(self, point_or_mobject, aligned_edge=ORIGIN, coor_mask=np.array([1, 1, 1])):
-        self.__wrapped__.move_to(point_or_mobject, aligned_edge, coor_mask)
-        self._update_bounds_to_direction(aligned_edge)
-        self.autoscale(aligned_edge)
+        super().move_to(point_or_mobject, aligned_edge, coor_mask)
+        self._placed(aligned_edge)
 
         return self
 
     def set_x(self, x, direction=ORIGIN):
-        self.__wrapped__.set_x(x, direction)
-        self._update_bounds_to_direction(direction)
-        self.autoscale(direction)
+        super().set_x(x, direction)
+        self._placed(direction)
 
         return self
 
@@ -97,18 +140,16 @@ class AutoScaled(ObjectProxy):
         """
         Autoscales between two X values
         """
-        self._bounds.ur = np.array((x_right, self._bounds.ur[1], self._bounds.ur[2]))
-        self._bounds.dr = np.array((x_right, self._bounds.dr[1], self._bounds.dr[2]))
+        self._bounds.box[1, 0] = x_right
         self.set_x(x_left, LEFT)
         self._update_bounds_to_direction(LEFT)
-        self.autoscale(LEFT)
+        self._autoscale(LEFT)
 
         return self
 
     def set_y(self, y, direction=ORIGIN):
-        self.__wrapped__.set_y(y)
-        self._update_bounds_to_direction(direction)
-        self.autoscale(direction)
+        super().set_y(y)
+        self._placed(direction)
 
         return self
 
@@ -117,7 +158,7 @@ class AutoScaled(ObjectProxy):
         Resets the scaling to full screen
         """
         self.reset_bounds()
-        self.__wrapped__.center()
+        self.center()
         self.autoscale(ORIGIN)
         return self
 
@@ -126,17 +167,19 @@ class AutoScaled(ObjectProxy):
         y_rad = config["frame_y_radius"]
         buff = DEFAULT_MOBJECT_TO_MOBJECT_BUFFER
 
-        self._bounds.ul = np.array((x_rad * -1 + buff, y_rad - buff, 0))
-        self._bounds.ur = np.array((x_rad - buff, y_rad - buff, 0))
-        self._bounds.dr = np.array((x_rad - buff, y_rad * -1 + buff, 0))
-        self._bounds.dl = np.array((x_rad * -1 + buff, y_rad * -1 + buff, 0))
+        self._bounds.box = np.array(((x_rad * -1 + buff, y_rad * -1 + buff, 0), (x_rad - buff, y_rad - buff, 0)))
         return self
 
-    def to_edge(self, edge=LEFT, buff=DEFAULT_MOBJECT_TO_EDGE_BUFFER):
-        self.__wrapped__.to_edge(edge, buff)
+    def set_bounds(self, bounds: Bounds):
+        """
+        Sets the area to scale within until the bounds are reset, such as by `full_size`
+        """
+        self._bounds.box = np.array(bounds.box)
+        return self
 
-        self._update_bounds_to_direction(edge)
-        self.autoscale(edge)
+    def to_edge(self, edge=LEFT, buff=DEFAULT_MOBJECT_TO_EDGE_BUFFER):
+        super().to_edge(edge, buff)
+        self._placed(edge)
 
         return self
 
@@ -147,28 +190,43 @@ class AutoScaled(ObjectProxy):
         Args:
             direction: The direction to scale in
         """
-        if not self.__wrapped__.get_width() or not self.__wrapped__.get_height():
+        self._mobject_bounds = None
+        self._autoscale(direction)
+
+    def _autoscale(self, direction: np.array):
+        current = self._get_mobject_bounds()
+        if not current.width or not current.height:
             return
-        x_scale = self._bounds.width / self.__wrapped__.get_width()
-        y_scale = self._bounds.height / self.__wrapped__.get_height()
-        self.scale(min(x_scale, y_scale), about_point=self._bounds.as_mobject().get_critical_point(direction))
+        scale_factor = min(self._bounds.width / current.width, self._bounds.height / current.height)
+        about_point = self._bounds.get_critical_point(direction)
+        self.scale(scale_factor, about_point=about_point)
+        # scaling is affine, so the measured bounds can follow along without another pass over the points
+        current.scale(scale_factor, about_point)
+        self._mobject_bounds = current
+
+    def _placed(self, direction: np.array):
+        # the wrapped object just moved, so any measured bounds are out of date
+        self._mobject_bounds = None
+        self._update_bounds_to_direction(direction)
+        self._autoscale(direction)
+
+    def _get_mobject_bounds(self) -> Bounds:
+        if self._mobject_bounds is None:
+            self._mobject_bounds = get_bounds(self)
+        return self._mobject_bounds
 
     def _update_bounds_to_direction(self, direction: np.array):
-        if direction[0] == -1:
-            new_x = self.__wrapped__.get_x(LEFT)
-            self._bounds.ul = np.array((new_x, self._bounds.ul[1], self._bounds.ul[2]))
-            self._bounds.dl = np.array((new_x, self._bounds.dl[1], self._bounds.dl[2]))
-
-        elif direction[0] == 1:
-            new_x = self.__wrapped__.get_x(RIGHT)
-            self._bounds.ur = np.array((new_x, self._bounds.ur[1], self._bounds.ur[2]))
-            self._bounds.dr = np.array((new_x, self._bounds.dr[1], self._bounds.dr[2]))
-
-        if direction[1] == -1:
-            new_y = self.__wrapped__.get_y(DOWN)
-            self._bounds.dr = np.array((self._bounds.dr[0], new_y, self._bounds.dr[2]))
-            self._bounds.dl = np.array((self._bounds.dl[0], new_y, self._bounds.dl[2]))
-        elif direction[1] == 1:
-            new_y = self.__wrapped__.get_y(UP)
-            self._bounds.ur = np.array((self._bounds.ur[0], new_y, self._bounds.ur[2]))
-            self._bounds.ul = np.array((self._bounds.ul[0], new_y, self._bounds.ul[2]))
+        self._bounds.copy_sides(direction, self._get_mobject_bounds())
+
+
+@lru_cache(maxsize=None)
+def _autoscaled_class(base: type) -> type:
+    return type(f"AutoScaled{base.__name__}", (AutoScaled, base), {"__module__": base.__module__})
+
+
+def _autoscaled_base(cls: type) -> type:
+    return next(base for base in cls.__bases__ if base is not AutoScaled)
+
+
+def _new_autoscaled(base: type) -> AutoScaled:
+    return AutoScaled.__new__(_autoscaled_class(base))
@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from tempfile import NamedTemporaryFile
+from typing import Any
+from typing import Dict
+from typing import Hashable
+from typing import Optional
+from typing import Tuple
+
+CACHE_DIR_ENV = "CODEVIDGEN_CACHE_DIR"
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "codevidgen")
+
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+_file_hashes: Dict[Tuple[str, int, int], str] = {}
+
+
+def get_cache_dir() -> str:
+    """
+    Gets the root directory of the on-disk cache, overridable with the `CODEVIDGEN_CACHE_DIR`
+    environment variable
+    """
+    return os.environ.get(CACHE_DIR_ENV) or DEFAULT_CACHE_DIR
+
+
+def file_key(path: str) -> Tuple[str, int, int]:
+    """
+    Gets a key for the current version of a file out of its path, modification time and size,
+    for caching anything derived from the file without reading it
+    """
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+
+def file_hash(path: str) -> str:
+    """
+    Gets the content hash of a file. Hashes are remembered for the life of the process as
+    long as the file's modification time and size don't change.
+
+    Args:
+        path: The file path
+    """
+    key = file_key(path)
+    result = _file_hashes.get(key)
+    if result is None:
+        digest = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        result = digest.hexdigest()
+        _file_hashes[key] = result
+    return result
+
+
+def cache_key(*parts: Any) -> str:
+    """
+    Builds a cache key out of any values with a stable `repr`
+    """
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+class DiskCache:
+    """
+    A persistent, size-bounded cache of files in a namespaced directory. When the total size
+    goes over `max_size`, the least recently used entries are evicted.
+    """
+
+    def __init__(self, namespace: str, max_size: int = DEFAULT_MAX_SIZE):
+        """
+        Args:
+            namespace: The sub-directory of the cache directory to use
+            max_size: The maximum size of the namespace in bytes
+        """
+        self.namespace = namespace
+        self.max_size = max_size
+
+    @property
+    def directory(self) -> str:
+        return os.path.join(get_cache_dir(), self.namespace)
+
+    def path(self, key: str, suffix: str = "") -> str:
+        """
+        Gets the path an entry is, or would be, stored at
+        """
+        return os.path.join(self.directory, f"{key}{suffix}")
+
+    def get_path(self, key: str, suffix: str = "") -> Optional[str]:
+        """
+        Gets the path of an existing entry, marking it as recently used
+        """
+        path = self.path(key, suffix)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def new_file(self, suffix: str = ""):
+        """
+        Creates a temporary file in the cache directory to be filled and then stored with `put_file`
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        return NamedTemporaryFile(dir=self.directory, prefix=".tmp-", suffix=suffix, delete=False)
+
+    def put_file(self, key: str, tmp_path: str, suffix: str = "") -> str:
+        """
+        Atomically moves a file created with `new_file` into the cache
+
+        Returns:
+            The path of the cached entry
+        """
+        path = self.path(key, suffix)
+        os.replace(tmp_path, path)
+        self.evict()
+        return path
+
+    def get_json(self, key: str) -> Optional[Any]:
+        path = self.get_path(key, ".json")
+        if not path:
+            return None
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except ValueError:
+            return None
+
+    def put_json(self, key: str, value: Any):
+        with self.new_file(".json") as f:
+            f.write(json.dumps(value).encode())
+        self.put_file(key, f.name, ".json")
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the namespace fits in `max_size`
+        """
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.startswith(".tmp-") or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        if total <= self.max_size:
+            return
+
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            if total <= self.max_size:
+                break
+
+
+class LRUCache:
+    """
+    An in-process cache that keeps the `max_size` most recently used entries
+    """
+
+    def __init__(self, max_size: int = 128):
+        self.max_size = max_size
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        try:
+            self._entries.move_to_end(key)
+        except KeyError:
+            return default
+        return self._entries[key]
+
+    def put(self, key: Hashable, value: Any):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable):
+        return key in self._entries
@@ -1,12 +1,43 @@
-from tempfile import NamedTemporaryFile
+import hashlib
+from functools import lru_cache
 from typing import List
 from typing import Optional
+from typing import Tuple
 
+from manim import Animation
+from manim import AnimationGroup
 from manim import Code
-from manim import Transform
+from manim import DOWN
+from manim import FadeIn
+from manim import FadeOut
+from manim import LEFT
+from manim import np
+from manim import Paragraph
+from manim import RIGHT
+from manim import UP
+from manim import VGroup
+from manim.mobject.svg.code_mobject import insert_line_numbers_in_html
+from pygments import format as format_tokens
+from pygments.formatters.html import HtmlFormatter
+from pygments.lexers import get_lexer_for_filename
 
+from code_video import comment_parser
+from code_video.cache import cache_key
+from code_video.cache import LRUCache
+from code_video.comment_parser import SourceLine
+from code_video.comment_parser import Token
+from code_video.diff import diff_lines
+from code_video.diff import find_moves
 
-class HighlightLines(Transform):
+DIMMED_OPACITY = 0.3
+
+_rendered_code = LRUCache(max_size=32)
+
+# the styles manim's Code uses for the highlighted html
+_HTML_STYLES = "overflow:auto;width:auto;border:solid gray;border-width:.1em .1em .1em .8em;padding:.2em .6em;"
+
+
+class HighlightLines(Animation):
     """
     Highlights lines by reducing the opacity of all non-highlighted lines
     """
@@ -21,23 +52,42 @@ class HighlightLines(Transform):
         super().__init__(code, **kwargs)
         self.start_line_number = start
         self.end_line_number = end
+        self._changed_lines = np.empty(0, dtype=int)
+        self._start_opacities = np.empty(0)
+        self._end_opacities = np.empty(0)
 
-    def create_target(self):
-        target = self.mobject.copy()
+    def begin(self):
+        lines = self.mobject.code
         if self.end_line_number == -1:
-            self.end_line_number = len(target.line_numbers) + self.mobject.line_no_from
+            self.end_line_number = len(self.mobject.line_numbers) + self.mobject.line_no_from
+
+        line_numbers = np.arange(len(lines)) + self.mobject.line_no_from
+        in_range = (line_numbers >= self.start_line_number) & (line_numbers <= self.end_line_number)
+        current = getattr(lines, "line_opacities", None)
+        if current is None or len(current) != len(lines):
+            current = np.ones(len(lines))
+        target = np.where(in_range, 1, DIMMED_OPACITY)
 
-        self.start_line_number -= self.mobject.line_no_from - 1
-        self.end_line_number -= self.mobject.line_no_from - 1
+        # only lines whose opacity changes are touched while animating
+        self._changed_lines = np.flatnonzero(current != target)
+        self._start_opacities = current[self._changed_lines]
+        self._end_opacities = target[self._changed_lines]
+        lines.line_opacities = target
+        super().begin()
 
-        def in_range(number: int):
-            return self.start_line_number <= number <= self.end_line_number
+    def create_starting_mobject(self):
+        # the start state is kept as opacity arrays, so there is no need to copy the whole code object
+        return self.mobject
 
-        # highlight code lines
-        for line_no in range(len(self.mobject.code)):
-            target.code[line_no].set_opacity(1 if in_range(line_no + 1) else 0.3)
-            target.line_numbers[line_no].set_opacity(1 if in_range(line_no + 1) else 0.3)
-        return target
+    def interpolate_mobject(self, alpha: float):
+        if not len(self._changed_lines):
+            return
+        opacities = self._start_opacities + (self._end_opacities - self._start_opacities) * self.rate_func(alpha)
+        lines = self.mobject.code
+        line_numbers = self.mobject.line_numbers
+        for line_no, opacity in zip(self._changed_lines, opacities):
+            lines[line_no].set_opacity(opacity)
+            line_numbers[line_no].set_opacity(opacity)
 
 
 class HighlightLine(HighlightLines):
@@ -69,7 +119,9 @@ class HighlightNone(HighlightLines):
 
 class PartialCode(Code):
     """
-    Renders source code files or strings in part, delineated by line numbers
+    Renders source code files or strings in part, delineated by line numbers. The code is rendered
+    straight from memory and the result reused for identical code and settings. Files are highlighted
+    with the tokens already lexed by the comment parser.
     """
 
     def __init__(
@@ -79,6 +131,7 @@ class PartialCode(Code):
         extension: str = "py",
         start_line: int = 1,
         end_line: Optional[int] = None,
+        tokens: Optional[List[List[Token]]] = None,
         **kwargs,
     ):
         """
@@ -86,6 +139,9 @@ class PartialCode(Code):
             path: The source code file path. Either this or `code` must be set
             code: A list of code lines as strings. Either this or `path` must be set
             extension: The code extension, required if using `code`
+            start_line: The first line number to display
+            end_line: The last line number to display when using `path`, defaults to the end of the file
+            tokens: The highlighting tokens of each line in `code`, as parsed by `comment_parser`
         """
 
         if not code and not path:
@@ -98,14 +154,351 @@ class PartialCode(Code):
             extension = path.split(".")[-1]
 
         if path:
-            with open(path, "r") as f:
-                code = f.readlines()
-                if end_line:
-                    code = code[start_line - 1 : end_line]
+            lines = comment_parser.lex(path)[start_line - 1 : end_line]
+            code = [line.text for line in lines]
+            tokens = [line.tokens for line in lines]
+
+        code_string = "".join(code)
+        language = _language_for_extension(extension)
+        key = cache_key(
+            hashlib.sha1(code_string.encode()).hexdigest(),
+            language,
+            start_line,
+            # the same text can be lexed differently, like with comments stripped
+            hashlib.sha1(repr(tokens).encode()).hexdigest() if tokens is not None else None,
+            sorted(kwargs.items()),
+        )
+        template = _rendered_code.get(key)
+        if template is None:
+            self._line_tokens = tokens
+            super().__init__(code=code_string, language=language, line_no_from=start_line, **kwargs)
+            self._line_tokens = None
+            _rendered_code.put(key, self.copy())
+        else:
+            # Rendering and highlighting is the expensive part, so take over the state of a copy instead
+            self.__dict__.update(template.copy().__dict__)
+        # what is rendered, for keying the partial movies of animations of it
+        self.render_key = key
+        # the file the lines came from, for looking up symbols
+        self.source_path = path
+
+    def gen_html_string(self):
+        if self._line_tokens is None or self.generate_html_file:
+            super().gen_html_string()
+            return
+
+        formatter = HtmlFormatter(
+            style=self.style or "colorful",
+            linenos=False,
+            noclasses=True,
+            cssclass="",
+            cssstyles=_HTML_STYLES,
+            prestyles="margin: 0",
+        )
+        html = format_tokens((token for line in self._line_tokens for token in line), formatter)
+        if self.insert_line_no:
+            html = insert_line_numbers_in_html(html, self.line_no_from)
+        self.html_string = "<!-- HTML generated by Code() -->" + html
+
+
+class TransformCode(Animation):
+    """
+    Transforms code into another version of it, line by line. Unchanged and moved lines slide to their
+    new rows, deleted lines fade out and only the inserted lines are rendered, so the work grows with
+    the size of the change rather than the size of the code.
+    """
+
+    def __init__(self, code: Code, old: List[SourceLine], new: List[SourceLine], extension: str = "py", **kwargs):
+        """
+        Args:
+            code: The code instance displaying the `old` lines, with line numbers
+            old: The lexed lines the code displays
+            new: The lexed lines to transform the code to
+            extension: The code extension, used to render the inserted lines
+        """
+        if not code.insert_line_no or len(code.code) != len(old):
+            raise ValueError("The code must display the old lines, with line numbers")
+        if not new:
+            raise ValueError("Must define the new lines")
+
+        old_text = [line.text.rstrip("\n") for line in old]
+        new_text = [line.text.rstrip("\n") for line in new]
+        ops = diff_lines(old_text, new_text)
+        moves = find_moves(old_text, new_text, ops)
+        inserted = sorted(
+            set(j for op in ops if op.tag != "equal" for j in range(op.j1, op.j2)) - set(moves.values())
+        )
+        changed = [j for op in ops if op.tag != "equal" for j in range(op.j1, op.j2)]
+        size = sum(max(op.i2 - op.i1, op.j2 - op.j1) for op in ops if op.tag != "equal")
+        kwargs.setdefault("run_time", float(np.clip(0.5 + 0.1 * size, 1, 3)))
+        super().__init__(code, **kwargs)
+
+        # the first and last line numbers of the new version that changed, empty when lines were only deleted
+        self.changed_lines: List[int] = (
+            [code.line_no_from + changed[0], code.line_no_from + changed[-1]] if changed else []
+        )
+        self._rows: List[VGroup] = [None] * len(new)
+        self._shifts: List[Tuple[VGroup, np.ndarray]] = []
+        self._fades: List[Tuple[VGroup, float, float]] = []
+
+        current = getattr(code.code, "line_opacities", None)
+        if current is None or len(current) != len(old):
+            current = np.ones(len(old))
+        self._opacities = np.ones(len(new))
+
+        numbers = code.line_numbers
+        top = numbers[0].get_y()
+        self._pitch = (top - numbers[-1].get_y()) / (len(old) - 1) if len(old) > 1 else 0
+        self._inserted: List[VGroup] = []
+        if inserted:
+            self._inserted = self._render_lines(code, old, [new[j] for j in inserted], inserted, extension)
+            for j, line in zip(inserted, self._inserted):
+                self._rows[j] = line
+
+        for op in ops:
+            if op.tag == "equal":
+                lines = code.code[op.i1 : op.i2]
+                self._rows[op.j1 : op.j2] = lines
+                self._opacities[op.j1 : op.j2] = current[op.i1 : op.i2]
+                if op.i1 != op.j1:
+                    self._shifts.append((VGroup(*lines), UP * (op.i1 - op.j1) * self._pitch))
+                continue
+            for i in range(op.i1, op.i2):
+                if i in moves:
+                    self._rows[moves[i]] = code.code[i]
+                    self._opacities[moves[i]] = current[i]
+                    self._shifts.append((code.code[i], UP * (i - moves[i]) * self._pitch))
                 else:
-                    code = code[start_line - 1 :]
+                    self._fades.append((code.code[i], current[i], 0))
+
+        # line numbers stay on their rows, so only the rows added or removed at the end need numbers
+        self._numbers: List[VGroup] = list(numbers[: len(new)])
+        for row in np.flatnonzero(current[: len(new)] != self._opacities[: len(old)]):
+            self._fades.append((numbers[row], current[row], self._opacities[row]))
+        if len(new) > len(old):
+            extra = Paragraph(
+                *[str(code.line_no_from + row) for row in range(len(old), len(new))],
+                line_spacing=code.line_spacing,
+                alignment="right",
+                font_size=code.font_size,
+                font=code.font,
+                disable_ligatures=True,
+            )
+            extra.set_color(numbers[0].get_color())
+            extra.scale(numbers[0].height / extra[0].height)
+            for row, number in enumerate(extra, start=len(old)):
+                number.shift(RIGHT * (numbers.get_right()[0] - number.get_right()[0]))
+                number.set_y(top - row * self._pitch)
+                number.set_opacity(0)
+                self._fades.append((number, 0, self._opacities[row]))
+            self._numbers += list(extra)
+        for row in range(len(new), len(old)):
+            self._fades.append((numbers[row], current[row], 0))
+
+        background = code.background_mobject
+        self._panel = background[0] if background.submobjects else background
+        self._panel_start = self._panel.copy()
+        self._panel_end = self._panel.copy()
+        self._panel_end.stretch_to_fit_height(
+            max(self._panel.height + (len(new) - len(old)) * self._pitch, self._pitch), about_edge=UP
+        )
+        code_right = code.code.get_right()[0]
+        right = max([line.get_right()[0] for line in self._inserted if line.has_points()] + [code_right])
+        right += self._panel.get_right()[0] - code_right
+        if right > self._panel.get_right()[0]:
+            self._panel_end.stretch_to_fit_width(right - self._panel.get_left()[0], about_edge=LEFT)
+        self._alpha = 0.0
+        render_key = getattr(code, "render_key", None)
+        new_code = "".join(line.text for line in new)
+        self._render_key = render_key and cache_key(render_key, hashlib.sha1(new_code.encode()).hexdigest())
+
+    def begin(self):
+        self.mobject.code.add(*self._inserted)
+        self.mobject.line_numbers.add(*self._numbers[len(self.mobject.line_numbers) :])
+        super().begin()
+
+    def create_starting_mobject(self):
+        # lines are shifted and faded in place, so there is no need to copy the whole code object
+        return self.mobject
+
+    def interpolate_mobject(self, alpha: float):
+        alpha = self.rate_func(alpha)
+        for mobject, shift in self._shifts:
+            mobject.shift(shift * (alpha - self._alpha))
+        for mobject, start, end in self._fades:
+            mobject.set_opacity(start + (end - start) * alpha)
+        self._panel.interpolate(self._panel_start, self._panel_end, alpha)
+        self._alpha = alpha
+
+    def clean_up_from_scene(self, scene):
+        super().clean_up_from_scene(scene)
+        code = self.mobject
+        code.code.submobjects = list(self._rows)
+        if hasattr(code.code, "chars"):
+            code.code.chars.submobjects = list(self._rows)
+        code.line_numbers.submobjects = list(self._numbers)
+        code.code.line_opacities = self._opacities
+        if self._render_key:
+            code.render_key = self._render_key
+
+    def _render_lines(
+        self, code: Code, old: List[SourceLine], lines: List[SourceLine], rows: List[int], extension: str
+    ) -> List[VGroup]:
+        # renders the lines after a line already displayed, to match its size and position
+        reference = next((i for i, line in enumerate(old) if line.text.strip()), None)
+        if reference is None:
+            raise ValueError("The code must display at least one line that isn't blank")
+
+        snippet = PartialCode(
+            code=[old[reference].text] + [line.text for line in lines],
+            extension=extension,
+            tokens=[old[reference].tokens] + [line.tokens for line in lines],
+            style=code.style,
+            font=code.font,
+            font_size=code.font_size,
+            tab_width=code.tab_width,
+            line_spacing=code.line_spacing,
+        )
+        target = code.code[reference]
+        snippet.scale(target.width / snippet.code[0].width)
+        snippet.shift(target.get_left() - snippet.code[0].get_left())
+        if not self._pitch:
+            self._pitch = snippet.line_numbers[0].get_y() - snippet.line_numbers[1].get_y()
+
+        top = code.line_numbers[0].get_y()
+        rendered = []
+        for line, number, row in zip(snippet.code[1:], snippet.line_numbers[1:], rows):
+            line.shift(UP * (top - row * self._pitch - number.get_y()))
+            line.set_opacity(0)
+            self._fades.append((line, 0, 1))
+            rendered.append(line)
+        return rendered
+
+
+class CodeViewport(VGroup):
+    """
+    Displays a scrolling window onto a source file. Only the lines in view, plus a margin, are
+    rendered, so large files stay readable and cheap to animate.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        code: Optional[List[str]] = None,
+        extension: str = "py",
+        visible_lines: int = 30,
+        margin: int = 5,
+        start_line: int = 1,
+        tokens: Optional[List[List[Token]]] = None,
+        **kwargs,
+    ):
+        """
+        Args:
+            path: The source code file path. Either this or `code` must be set
+            code: A list of code lines as strings. Either this or `path` must be set
+            extension: The code extension, required if using `code`
+            visible_lines: The number of lines to keep in view
+            margin: The number of extra lines to render above and below the lines in view
+            start_line: The line number of the first line in `code`
+            tokens: The highlighting tokens of each line in `code`, as parsed by `comment_parser`
+        """
+        super().__init__()
+        if not code and not path:
+            raise ValueError("Must define file_name or code")
+
+        if path:
+            extension = path.split(".")[-1]
+            lines = comment_parser.lex(path)
+            code = [line.text for line in lines]
+            tokens = [line.tokens for line in lines]
+
+        self.lines = code
+        self.tokens = tokens
+        self.source_path = path
+        self.extension = extension
+        self.visible_lines = visible_lines
+        self.margin = margin
+        self.first_line_no = start_line
+        self.code_kwargs = kwargs
+
+        self.window = self._render(start_line)
+        self._window_height = self.window.height
+        self.add(self.window)
+
+    @property
+    def code(self) -> VGroup:
+        return self.window.code
+
+    @property
+    def line_numbers(self) -> VGroup:
+        return self.window.line_numbers
+
+    @property
+    def line_no_from(self) -> int:
+        return self.window.line_no_from
+
+    @property
+    def last_line_no(self) -> int:
+        return self.first_line_no + len(self.lines) - 1
+
+    def is_in_view(self, start: int, end: int) -> bool:
+        """
+        Whether the given lines are rendered and not only part of the margin
+        """
+        window_start, window_end = self._window_range(self.line_no_from)
+        view_start = window_start if window_start == self.first_line_no else window_start + self.margin
+        view_end = window_end if window_end == self.last_line_no else window_end - self.margin
+        return view_start <= start and end <= view_end
+
+    def scroll_to(self, start: int, end: Optional[int] = None) -> Optional[Animation]:
+        """
+        Moves the window so the given lines are in view, keeping the current position and scale
+
+        Args:
+            start: The first line number to show
+            end: The last line number to show, defaults to `start`
+
+        Returns:
+            The scroll animation to play, or `None` if the lines are already in view
+        """
+        if end is None or end == -1:
+            end = start
+        first, _ = self._window_range(start - self.margin)
+        if self.is_in_view(start, end) or first == self.line_no_from:
+            return None
+
+        old = self.window
+        new = self._render(first)
+        scale = old.height / self._window_height
+        self._window_height = new.height
+        new.scale(scale)
+        new.align_to(old, UP)
+        new.align_to(old, LEFT)
+
+        direction = UP if new.line_no_from > old.line_no_from else DOWN
+        shift = direction * old.height / 4
+        self.remove(old)
+        self.add(new)
+        self.window = new
+        return AnimationGroup(FadeOut(old, shift=shift), FadeIn(new, shift=shift))
+
+    def _window_range(self, first: int) -> Tuple[int, int]:
+        size = self.visible_lines + self.margin * 2
+        first = max(self.first_line_no, min(first, self.last_line_no - size + 1))
+        return first, min(self.last_line_no, first + size - 1)
+
+    def _render(self, first: int) -> PartialCode:
+        first, last = self._window_range(first)
+        offset = self.first_line_no
+        return PartialCode(
+            code=self.lines[first - offset : last - offset + 1],
+            extension=self.extension,
+            start_line=first,
+            tokens=self.tokens[first - offset : last - offset + 1] if self.tokens is not None else None,
+            **self.code_kwargs,
+        )
+
 
-        with NamedTemporaryFile(suffix=f".{extension}") as f:
-            f.writelines([line.encode() for line in code])
-            f.flush()
-            super().__init__(f.name, line_no_from=start_line, **kwargs)
+@lru_cache(maxsize=None)
+def _language_for_extension(extension: str) -> str:
+    return get_lexer_for_filename(f"code.{extension}").aliases[0]
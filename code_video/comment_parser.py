@@ -1,8 +1,32 @@
+import re
+from typing import Iterable
+from typing import Iterator
 from typing import List
+from typing import NamedTuple
 from typing import Optional
 from typing import Tuple
 
 from pygments.lexers import get_lexer_for_filename
+from pygments.token import _TokenType
+from pygments.token import Comment as CommentToken
+
+from code_video.cache import file_key
+from code_video.cache import LRUCache
+
+END_MARKER = "end"
+
+Token = Tuple[_TokenType, str]
+
+# comments that are code as far as the reader is concerned
+_NOT_CAPTIONS = (CommentToken.Hashbang, CommentToken.Preproc, CommentToken.PreprocFile)
+
+_COMMENT_START = re.compile(r"^(?:/\*+|\*+(?!/)|<!--|\(\*|\{-|#+|/{2,}|-{2,}|;+|%+|'|!)\s?")
+
+_COMMENT_END = re.compile(r"\s*(?:\*+/|-->|\*\)|-\})$")
+
+_lexed_files = LRUCache(max_size=64)
+
+_parsed_files = LRUCache(max_size=64)
 
 
 class Comment:
@@ -17,36 +41,110 @@ class Comment:
     def __bool__(self):
         return bool(self.lines)
 
+    def copy(self) -> "Comment":
+        result = Comment()
+        result.lines = list(self.lines)
+        result.start = self.start
+        result.end = self.end
+        return result
+
     @property
     def caption(self):
-        return "\n".join(self.lines)
+        # block comment delimiters on their own line leave blank lines behind
+        return "\n".join(self.lines).strip("\n")
+
+
+class SourceLine(NamedTuple):
+    text: str
+    tokens: List[Token]
+    # the comment text, if the line holds nothing but a comment
+    comment: Optional[str]
+
+
+class ParsedCode(NamedTuple):
+    code: List[str]
+    comments: List[Comment]
+    tokens: List[List[Token]]
+    # the line number in the file of each code line, which differ once comments are stripped
+    line_numbers: List[int]
+
+
+def lex(path: str) -> List[SourceLine]:
+    """
+    Splits a source file into lines of Pygments tokens, picking out lines that are only a comment.
+    Files are lexed once for as long as their modification time and size don't change.
+
+    Args:
+        path: The source code file path
+    """
+    key = file_key(path)
+    lines = _lexed_files.get(key)
+    if lines is None:
+        with open(path, "r") as f:
+            lines = lex_source(f.read(), path)
+        _lexed_files.put(key, lines)
+    return lines
+
+
+def lex_source(source: str, filename: str) -> List[SourceLine]:
+    """
+    Splits source code into lines of Pygments tokens, like `lex`, for code that isn't in a file
+
+    Args:
+        source: The source code
+        filename: The file name to pick the lexer by
+    """
+    lexer = get_lexer_for_filename(filename, source, stripnl=False)
+    return list(_split_lines(lexer.get_tokens(source)))
+
+
+def parse_file(path: str, keep_comments: bool, start_line: int, end_line: Optional[int]) -> ParsedCode:
+    """
+    Parses a section of a source file into its code lines, the comments describing them, and the
+    highlighting tokens of each code line
+
+    Args:
+        path: The source code file path
+        keep_comments: Whether to keep comments in the code or strip them
+        start_line: The first line number to parse
+        end_line: The last line number to parse, defaults to the end of the file
+    """
+    key = (file_key(path), keep_comments, start_line, end_line)
+    parsed = _parsed_files.get(key)
+    if parsed is None:
+        parsed = _parse_lines(lex(path)[start_line - 1 : end_line], keep_comments, start_line)
+        _parsed_files.put(key, parsed)
+    # callers may change what they get, like a caption, so they each get their own lists and comments
+    return ParsedCode(
+        code=list(parsed.code),
+        comments=[comment.copy() for comment in parsed.comments],
+        tokens=[list(line) for line in parsed.tokens],
+        line_numbers=list(parsed.line_numbers),
+    )
 
 
 def parse(
     path: str, keep_comments: bool, start_line: int, end_line: Optional[int]
 ) -> Tuple[List[str], List[Comment]]:
+    parsed = parse_file(path, keep_comments, start_line, end_line)
+    return parsed.code, parsed.comments
+
+
+def _parse_lines(lines: Iterable[SourceLine], keep_comments: bool, start_line: int) -> ParsedCode:
     code: List[str] = []
+    tokens: List[List[Token]] = []
+    line_numbers: List[int] = []
     comments: List[Comment] = []
-    lexer = get_lexer_for_filename(path)
-    comment_marker = "#"
-    if lexer.name in ("JavaScript", "Java", "C++"):
-        comment_marker = "//"
-
-    with open(path, "r") as f:
-        comment = Comment()
-        lines = f.readlines()[start_line - 1 :]
-
-    if end_line and start_line - end_line < len(lines):
-        lines = lines[: end_line - start_line + 1]
-    for line in lines:
-        stripped = line.strip()
-        if stripped.startswith(f"{comment_marker} end"):
-            last_comment = comments[-1]
-            last_comment.end = len(code) + start_line - 1
+    comment = Comment()
+
+    for line_no, line in enumerate(lines, start=start_line):
+        if line.comment is not None and line.comment.startswith(END_MARKER):
+            if comments:
+                comments[-1].end = len(code) + start_line - 1
             if not keep_comments:
                 continue
-        elif stripped.startswith(comment_marker):
-            comment.append(stripped[2:].strip())
+        elif line.comment is not None:
+            comment.append(line.comment)
             if not keep_comments:
                 continue
         elif comment:
@@ -54,8 +152,39 @@ def parse(
             comment.end = comment.start
             comments.append(comment)
             comment = Comment()
-        code.append(line)
+        code.append(line.text)
+        tokens.append(line.tokens)
+        line_numbers.append(line_no)
 
-    if not code[-1].strip():
+    if code and not code[-1].strip():
         code = code[:-1]
-    return code, comments
+        tokens = tokens[:-1]
+        line_numbers = line_numbers[:-1]
+    return ParsedCode(code, comments, tokens, line_numbers)
+
+
+def _split_lines(tokens: Iterable[Token]) -> Iterator[SourceLine]:
+    line: List[Token] = []
+    for token_type, value in tokens:
+        *complete, rest = value.split("\n")
+        for part in complete:
+            line.append((token_type, part + "\n"))
+            yield _source_line(line)
+            line = []
+        if rest:
+            line.append((token_type, rest))
+    if line:
+        yield _source_line(line)
+
+
+def _source_line(tokens: List[Token]) -> SourceLine:
+    text = "".join(value for _, value in tokens)
+    content = [(token_type, value) for token_type, value in tokens if value.strip()]
+    comment = None
+    if content and all(
+        token_type in CommentToken and not any(token_type in other for other in _NOT_CAPTIONS)
+        for token_type, _ in content
+    ):
+        stripped = "".join(value for _, value in content).strip()
+        comment = _COMMENT_END.sub("", _COMMENT_START.sub("", stripped, count=1)).strip()
+    return SourceLine(text, tokens, comment)
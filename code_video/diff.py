@@ -0,0 +1,145 @@
+"""
+Line diffs between two versions of a file, read from disk or from git
+"""
+import os
+import subprocess
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from code_video import comment_parser
+from code_video.comment_parser import SourceLine
+
+
+class DiffOp(NamedTuple):
+    """
+    A run of lines in the style of `difflib` opcodes, where `tag` is one of "equal", "delete",
+    "insert" or "replace" and `a[i1:i2]` becomes `b[j1:j2]`
+    """
+
+    tag: str
+    i1: int
+    i2: int
+    j1: int
+    j2: int
+
+
+def read_version(path: str, revision: Optional[str] = None) -> List[SourceLine]:
+    """
+    Reads and lexes a file, either from disk or as it was at a git revision
+
+    Args:
+        path: The source code file path
+        revision: The git revision, like `HEAD~1`, or `None` for the file on disk
+    """
+    if revision is None:
+        return comment_parser.lex(path)
+
+    directory, name = os.path.split(os.path.abspath(path))
+    result = subprocess.run(
+        ["git", "show", f"{revision}:./{name}"], cwd=directory, capture_output=True, text=True, check=False
+    )
+    if result.returncode:
+        raise ValueError(f"Unable to read {path} at {revision}: {result.stderr.strip()}")
+    return comment_parser.lex_source(result.stdout, name)
+
+
+def diff_lines(a: Sequence[str], b: Sequence[str]) -> List[DiffOp]:
+    """
+    Diffs two sequences of lines with the Myers algorithm, after trimming their common start and
+    end, so the work grows with the size of the change rather than the size of the files
+    """
+    prefix = 0
+    while prefix < min(len(a), len(b)) and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < min(len(a), len(b)) - prefix and a[len(a) - 1 - suffix] == b[len(b) - 1 - suffix]:
+        suffix += 1
+
+    end_a, end_b = len(a) - suffix, len(b) - suffix
+    ops: List[DiffOp] = [DiffOp("equal", 0, prefix, 0, prefix)] if prefix else []
+    i, j = prefix, prefix
+    matches = [(x + prefix, y + prefix) for x, y in _myers(a[prefix:end_a], b[prefix:end_b])]
+    for x, y in matches + [(end_a, end_b)]:
+        if x > i or y > j:
+            tag = "replace" if x > i and y > j else "delete" if x > i else "insert"
+            ops.append(DiffOp(tag, i, x, j, y))
+        if x < end_a:
+            if ops and ops[-1].tag == "equal" and ops[-1].i2 == x and ops[-1].j2 == y:
+                ops[-1] = ops[-1]._replace(i2=x + 1, j2=y + 1)
+            else:
+                ops.append(DiffOp("equal", x, x + 1, y, y + 1))
+        i, j = x + 1, y + 1
+    if suffix:
+        if ops and ops[-1].tag == "equal" and ops[-1].i2 == end_a and ops[-1].j2 == end_b:
+            ops[-1] = ops[-1]._replace(i2=len(a), j2=len(b))
+        else:
+            ops.append(DiffOp("equal", end_a, len(a), end_b, len(b)))
+    return ops
+
+
+def find_moves(a: Sequence[str], b: Sequence[str], ops: Sequence[DiffOp]) -> Dict[int, int]:
+    """
+    Pairs up removed and added lines with the same, non blank, text
+
+    Returns:
+        The index in `b` of each line of `a` that moved
+    """
+    added: Dict[str, List[int]] = {}
+    for op in ops:
+        if op.tag != "equal":
+            for j in range(op.j1, op.j2):
+                if b[j].strip():
+                    added.setdefault(b[j], []).append(j)
+
+    moves: Dict[int, int] = {}
+    for op in ops:
+        if op.tag != "equal":
+            for i in range(op.i1, op.i2):
+                targets = added.get(a[i])
+                if targets:
+                    moves[i] = targets.pop(0)
+    return moves
+
+
+def _myers(a: Sequence[str], b: Sequence[str]) -> List[Tuple[int, int]]:
+    # the indexes of matching lines along a shortest edit script
+    n, m = len(a), len(b)
+    v = {1: 0}
+    trace = []
+    for d in range(n + m + 1):
+        trace.append(v.copy())
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[k - 1] < v[k + 1]):
+                x = v[k + 1]
+            else:
+                x = v[k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[x] == b[y]:
+                x, y = x + 1, y + 1
+            v[k] = x
+            if x >= n and y >= m:
+                return _backtrack(trace, n, m)
+    return []
+
+
+def _backtrack(trace: List[Dict[int, int]], x: int, y: int) -> List[Tuple[int, int]]:
+    matches = []
+    for d in range(len(trace) - 1, -1, -1):
+        v = trace[d]
+        k = x - y
+        if k == -d or (k != d and v[k - 1] < v[k + 1]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = v[prev_k]
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y:
+            x, y = x - 1, y - 1
+            matches.append((x, y))
+        x, y = prev_x, prev_y
+    matches.reverse()
+    return matches
@@ -1,9 +1,28 @@
+from collections import defaultdict
+from typing import Dict
+from typing import Hashable
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Sequence
+from typing import Set
+from typing import Tuple
+
+import networkx as nx
 from manim import config
 from manim import LEFT
+from manim import Mobject
 from manim import np
+from manim import ORIGIN
 from manim import RIGHT
 from manim import SMALL_BUFF
 
+from code_video.autoscale import AutoScaled
+from code_video.autoscale import Bounds
+from code_video.autoscale import get_bounds
+
+Box = Tuple[float, float, float, float]
+
 
 class ColumnLayout:
     """
@@ -36,3 +55,379 @@ class ColumnLayout:
             return x_right
         else:
             raise ValueError
+
+
+class GridLayout(ColumnLayout):
+    """
+    Lays out many mobjects at once in a grid of cells. Columns split the frame width like
+    `ColumnLayout` and rows are sized to fit their contents, with rows holding `fill` cells
+    sharing whatever height is left. Every size and position is solved before anything moves,
+    and each mobject is then scaled and shifted once.
+
+        layout = GridLayout(columns=3)
+        layout.add(title, row=1, column=1, span=3, align=UP)
+        layout.add(code, row=2, column=1, span=2, fill=True)
+        layout.add(callout, row=2, column=3, align=UL)
+        layout.apply()
+    """
+
+    def __init__(self, columns=2, rows: Optional[int] = None, buff=SMALL_BUFF):
+        """
+        Args:
+            columns: The number of columns
+            rows: The number of rows, defaults to the last row used
+            buff: The space between the edge of a cell and its contents
+        """
+        super().__init__(columns=columns, buff=buff)
+        self.rows = rows
+        self.top_y = config["frame_y_radius"]
+        self.cells: List[GridCell] = []
+
+    def add(
+        self,
+        mobject: Mobject,
+        row: int = 1,
+        column: int = 1,
+        span: int = 1,
+        row_span: int = 1,
+        align: np.ndarray = ORIGIN,
+        fill: bool = False,
+    ) -> "GridLayout":
+        """
+        Adds a mobject to a cell
+
+        Args:
+            mobject: The mobject to place
+            row: The row number, with 1 as the top row
+            column: The column number, with 1 as the first column
+            span: The number of columns to span
+            row_span: The number of rows to span
+            align: The edge or corner of the cell to align to, centered by default
+            fill: Whether to scale up to fill the cell and have its rows take the remaining height,
+                otherwise the mobject is only scaled down to fit
+        """
+        if row < 1 or column < 1 or span < 1 or row_span < 1 or column + span - 1 > len(self.columns):
+            raise ValueError(f"Cell at row {row}, column {column} is outside the grid")
+        self.cells.append(GridCell(mobject, row, column, span, row_span, np.asarray(align), fill))
+        return self
+
+    def solve(self) -> List["GridPlacement"]:
+        """
+        Solves the scale and position of every cell without moving anything
+        """
+        if not self.cells:
+            return []
+
+        row_count = self.rows or max(cell.row + cell.row_span - 1 for cell in self.cells)
+        if max(cell.row + cell.row_span - 1 for cell in self.cells) > row_count:
+            raise ValueError(f"Cells are outside the {row_count} rows of the grid")
+
+        bounds = [get_bounds(cell.mobject) for cell in self.cells]
+        widths = np.array([bound.width for bound in bounds])
+        heights = np.array([bound.height for bound in bounds])
+        cell_widths = np.array(
+            [
+                self.get_x(cell.column, cell.span, RIGHT) - self.get_x(cell.column, cell.span, LEFT)
+                for cell in self.cells
+            ]
+        )
+        width_scales = np.divide(cell_widths, widths, out=np.ones_like(widths), where=widths > 0)
+
+        # rows are bands of the frame height, with each cell inset by the buffer like columns
+        bands = np.zeros(row_count)
+        fill_rows = np.zeros(row_count, dtype=bool)
+        for idx in sorted(range(len(self.cells)), key=lambda idx: self.cells[idx].row_span):
+            cell = self.cells[idx]
+            rows = slice(cell.row - 1, cell.row - 1 + cell.row_span)
+            if cell.fill:
+                fill_rows[rows] = True
+                continue
+            needed = heights[idx] * min(width_scales[idx], 1) + 2 * self.buff
+            bands[rows.stop - 1] += max(needed - bands[rows].sum(), 0)
+
+        frame_height = self.top_y * 2
+        if fill_rows.any():
+            share = (frame_height - bands[~fill_rows].sum()) / fill_rows.sum()
+            bands[fill_rows] = np.maximum(bands[fill_rows], share)
+        if bands.sum() > frame_height:
+            bands *= frame_height / bands.sum()
+        row_tops = self.top_y - np.concatenate(([0], np.cumsum(bands)))
+
+        placements = []
+        for cell, bound, width, height in zip(self.cells, bounds, widths, heights):
+            last_row = cell.row - 1 + cell.row_span
+            target = Bounds(
+                (
+                    (self.get_x(cell.column, cell.span, LEFT), row_tops[last_row] + self.buff, 0),
+                    (self.get_x(cell.column, cell.span, RIGHT), row_tops[cell.row - 1] - self.buff, 0),
+                )
+            )
+            scales = [target.width / width if width else np.inf, target.height / height if height else np.inf]
+            if target.width <= 0 or target.height <= 0:
+                raise ValueError(f"Cell at row {cell.row}, column {cell.column} is too small for its buffer")
+            scale = min(scales)
+            if not np.isfinite(scale) or (not cell.fill and scale > 1):
+                scale = 1
+            about_point = bound.get_critical_point(cell.align)
+            shift = target.get_critical_point(cell.align) - about_point
+            shift[2] = 0
+            placements.append(GridPlacement(cell.mobject, scale, about_point, shift, target))
+        return placements
+
+    def apply(self) -> List["GridPlacement"]:
+        """
+        Solves the layout and moves every mobject into place. Autoscaled mobjects keep to their cell
+        when they are placed again later.
+        """
+        placements = self.solve()
+        for placement in placements:
+            if placement.scale != 1:
+                placement.mobject.scale(placement.scale, about_point=placement.about_point)
+            placement.mobject.shift(placement.shift)
+            if isinstance(placement.mobject, AutoScaled):
+                placement.mobject.set_bounds(placement.cell)
+        return placements
+
+
+class GridCell(NamedTuple):
+    mobject: Mobject
+    row: int
+    column: int
+    span: int
+    row_span: int
+    align: np.ndarray
+    fill: bool
+
+
+class GridPlacement(NamedTuple):
+    mobject: Mobject
+    scale: float
+    about_point: np.ndarray
+    shift: np.ndarray
+    cell: Bounds
+
+
+class SpatialIndex:
+    """
+    A uniform grid of bounding boxes for fast overlap queries
+    """
+
+    def __init__(self, cell_size: float = 1.0):
+        """
+        Args:
+            cell_size: The width and height of a grid cell
+        """
+        self.cell_size = cell_size
+        self._cells: Dict[Tuple[int, int], List[Tuple[Box, Hashable]]] = defaultdict(list)
+
+    def insert(self, box: Box, item: Hashable):
+        """
+        Adds an item
+
+        Args:
+            box: The item bounds as `(min_x, min_y, max_x, max_y)`
+            item: The item
+        """
+        for cell in self._cells_for(box):
+            self._cells[cell].append((box, item))
+
+    def query(self, box: Box) -> Set[Hashable]:
+        """
+        Finds all items whose bounds overlap the given bounds
+
+        Args:
+            box: The bounds as `(min_x, min_y, max_x, max_y)`
+        """
+        result = set()
+        for cell in self._cells_for(box):
+            for other, item in self._cells.get(cell, ()):
+                if other[0] < box[2] and box[0] < other[2] and other[1] < box[3] and box[1] < other[3]:
+                    result.add(item)
+        return result
+
+    def _cells_for(self, box: Box):
+        min_x, min_y = int(np.floor(box[0] / self.cell_size)), int(np.floor(box[1] / self.cell_size))
+        max_x, max_y = int(np.floor(box[2] / self.cell_size)), int(np.floor(box[3] / self.cell_size))
+        for x in range(min_x, max_x + 1):
+            for y in range(min_y, max_y + 1):
+                yield x, y
+
+
+class LayeredLayout:
+    """
+    Computes a layered (Sugiyama style) layout of a directed graph, flowing top to bottom,
+    with orthogonal edge routes
+    """
+
+    def __init__(self, node_buff: float = 0.5, layer_buff: float = 1.0, sweeps: int = 4):
+        """
+        Args:
+            node_buff: The horizontal space between nodes in a layer
+            layer_buff: The vertical space between layers, used for routing edges
+            sweeps: The number of crossing reduction passes in each direction
+        """
+        self.node_buff = node_buff
+        self.layer_buff = layer_buff
+        self.sweeps = sweeps
+
+    def solve(
+        self, sizes: Sequence[Tuple[float, float]], edges: Sequence[Tuple[int, int]]
+    ) -> Tuple[np.ndarray, List[Optional[np.ndarray]]]:
+        """
+        Lays out a graph
+
+        Args:
+            sizes: The `(width, height)` of each node
+            edges: The `(source, target)` node indexes of each edge
+
+        Returns:
+            The center point of each node, and the route points of each edge from source to target,
+            or `None` for edges from a node to itself
+        """
+        count = len(sizes)
+        graph = nx.DiGraph()
+        graph.add_nodes_from(range(count))
+        graph.add_edges_from((u, v) for u, v in edges if u != v)
+
+        # reverse postorder of a depth first search puts every edge outside a cycle forwards, so
+        # reversing the backward edges makes the graph acyclic
+        order = list(reversed(list(nx.dfs_postorder_nodes(graph))))
+        rank = {node: idx for idx, node in enumerate(order)}
+        forward = [(u, v) if rank[u] < rank[v] else (v, u) for u, v in edges if u != v]
+
+        # longest path layering
+        predecessors: Dict[int, List[int]] = defaultdict(list)
+        for u, v in forward:
+            predecessors[v].append(u)
+        layer_of = [0] * count
+        for node in order:
+            if predecessors[node]:
+                layer_of[node] = max(layer_of[u] for u in predecessors[node]) + 1
+
+        # split edges spanning several layers with zero-size dummy nodes
+        widths = [float(w) for w, _ in sizes]
+        heights = [float(h) for _, h in sizes]
+        chains: Dict[Tuple[int, int], List[int]] = {}
+        for u, v in forward:
+            if (u, v) in chains:
+                continue
+            chain = [u]
+            for layer in range(layer_of[u] + 1, layer_of[v]):
+                layer_of.append(layer)
+                widths.append(0.0)
+                heights.append(0.0)
+                chain.append(len(layer_of) - 1)
+            chain.append(v)
+            chains[(u, v)] = chain
+
+        up: Dict[int, List[int]] = defaultdict(list)
+        down: Dict[int, List[int]] = defaultdict(list)
+        for chain in chains.values():
+            for a, b in zip(chain, chain[1:]):
+                down[a].append(b)
+                up[b].append(a)
+
+        layers: List[List[int]] = [[] for _ in range(max(layer_of, default=-1) + 1)]
+        for node in sorted(range(len(layer_of)), key=lambda node: rank.get(node, node)):
+            layers[layer_of[node]].append(node)
+
+        self._reduce_crossings(layers, up, down)
+        x = self._assign_x(layers, widths, up)
+
+        layer_heights = [max((heights[node] for node in layer), default=0) for layer in layers]
+        layer_tops = np.concatenate(([0], -np.cumsum(np.array(layer_heights) + self.layer_buff)))
+        y = [layer_tops[layer_of[node]] - layer_heights[layer_of[node]] / 2 for node in range(len(layer_of))]
+
+        # horizontal segments sharing a channel between two layers are spread over separate tracks
+        tracks: Dict[int, List[Tuple[float, Tuple[int, int]]]] = defaultdict(list)
+        for key, chain in chains.items():
+            for a, b in zip(chain, chain[1:]):
+                tracks[layer_of[a]].append((min(x[a], x[b]), (a, b)))
+        track_y: Dict[Tuple[int, int], float] = {}
+        for layer, segments in tracks.items():
+            segments.sort()
+            spacing = self.layer_buff / 2 / max(len(segments), 1)
+            channel = layer_tops[layer] - layer_heights[layer] - self.layer_buff / 2
+            for idx, (_, hop) in enumerate(segments):
+                track_y[hop] = channel + (idx - (len(segments) - 1) / 2) * spacing
+
+        centers = np.array([(x[node], y[node]) for node in range(count)]).reshape((count, 2))
+        routes: List[Optional[np.ndarray]] = []
+        for u, v in edges:
+            if u == v:
+                routes.append(None)
+                continue
+            reverse = rank[u] > rank[v]
+            chain = chains[(v, u) if reverse else (u, v)]
+            points = [(x[chain[0]], y[chain[0]] - heights[chain[0]] / 2)]
+            for a, b in zip(chain, chain[1:]):
+                points.append((x[a], track_y[(a, b)]))
+                points.append((x[b], track_y[(a, b)]))
+            points.append((x[chain[-1]], y[chain[-1]] + heights[chain[-1]] / 2))
+            route = _simplify_route(np.array(points))
+            routes.append(route[::-1] if reverse else route)
+        return centers, routes
+
+    def _reduce_crossings(self, layers: List[List[int]], up: Dict[int, List[int]], down: Dict[int, List[int]]):
+        for _ in range(self.sweeps):
+            for idx in range(1, len(layers)):
+                _sort_by_barycenter(layers[idx], layers[idx - 1], up)
+            for idx in range(len(layers) - 2, -1, -1):
+                _sort_by_barycenter(layers[idx], layers[idx + 1], down)
+
+    def _assign_x(self, layers: List[List[int]], widths: List[float], up: Dict[int, List[int]]) -> List[float]:
+        x = [0.0] * len(widths)
+        for layer in layers:
+            # each node wants to sit under the average of its parents, and nodes without parents
+            # want to sit next to their neighbours
+            desired: List[Optional[float]] = [
+                sum(x[parent] for parent in up[node]) / len(up[node]) if up.get(node) else None for node in layer
+            ]
+            if all(want is None for want in desired):
+                total = sum(widths[node] for node in layer) + self.node_buff * (len(layer) - 1)
+                desired = [None] * len(layer)
+                desired[0] = (widths[layer[0]] - total) / 2
+            for idx in range(len(layer) - 2, -1, -1):
+                if desired[idx] is None and desired[idx + 1] is not None:
+                    desired[idx] = desired[idx + 1] - self._spacing(widths, layer[idx], layer[idx + 1])
+            for idx in range(1, len(layer)):
+                if desired[idx] is None:
+                    desired[idx] = desired[idx - 1] + self._spacing(widths, layer[idx - 1], layer[idx])
+
+            # push nodes right until they don't overlap, then shift the layer back to where its nodes
+            # wanted to be on average
+            placed = []
+            cursor = float("-inf")
+            for node, want in zip(layer, desired):
+                left = max(cursor, want - widths[node] / 2)
+                placed.append(left + widths[node] / 2)
+                cursor = left + widths[node] + self.node_buff
+            shift = float(np.mean(desired) - np.mean(placed)) if placed else 0
+            for node, pos in zip(layer, placed):
+                x[node] = pos + shift
+        return x
+
+    def _spacing(self, widths: List[float], left: int, right: int) -> float:
+        return widths[left] / 2 + self.node_buff + widths[right] / 2
+
+
+def _sort_by_barycenter(layer: List[int], neighbor_layer: List[int], neighbors: Dict[int, List[int]]):
+    positions = {node: idx for idx, node in enumerate(neighbor_layer)}
+    current = {node: idx for idx, node in enumerate(layer)}
+
+    def barycenter(node: int) -> float:
+        linked = [positions[other] for other in neighbors.get(node, ()) if other in positions]
+        return sum(linked) / len(linked) if linked else current[node]
+
+    layer.sort(key=barycenter)
+
+
+def _simplify_route(points: np.ndarray) -> np.ndarray:
+    # drop repeated points, then the middle points of straight runs
+    moved = np.abs(np.diff(points, axis=0)).max(axis=1) > 1e-9
+    points = points[np.concatenate(([True], moved))]
+    if len(points) < 3:
+        return points
+    direction = np.diff(points, axis=0)
+    cross = direction[:-1, 0] * direction[1:, 1] - direction[:-1, 1] * direction[1:, 0]
+    return np.concatenate((points[:1], points[1:-1][np.abs(cross) > 1e-9], points[-1:]))
@@ -0,0 +1,207 @@
+"""
+A project wide index of walkthrough comments, built by `codevidgen index`. Scenes can list and
+animate the comments of many files without parsing each one while rendering.
+"""
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from fnmatch import fnmatch
+from tempfile import NamedTemporaryFile
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
+from pygments.lexers import find_lexer_class_for_filename
+
+from code_video import comment_parser
+from code_video import symbols
+from code_video.cache import file_hash
+from code_video.cache import file_key
+from code_video.cache import LRUCache
+from code_video.comment_parser import Comment
+
+MANIFEST_VERSION = 1
+
+DEFAULT_MANIFEST = "codevidgen-manifest.json"
+
+DEFAULT_EXCLUDES = (".*", "__pycache__", "node_modules", "venv", "media", "build", "dist", DEFAULT_MANIFEST)
+
+_CHUNK_SIZE = 16
+
+_manifests = LRUCache(max_size=8)
+
+
+class ManifestEntry(NamedTuple):
+    hash: str
+    # the start line, end line and caption of each comment
+    comments: List[Tuple[int, int, str]]
+
+
+class IndexStats(NamedTuple):
+    parsed: int
+    unchanged: int
+    skipped: int
+
+
+class Manifest:
+    """
+    The comments of every source file under a root directory, with the content hash they were
+    parsed from
+    """
+
+    def __init__(self, root: str, files: Optional[Dict[str, ManifestEntry]] = None):
+        """
+        Args:
+            root: The directory the file paths are relative to
+            files: The entries by relative file path
+        """
+        self.root = os.path.abspath(root)
+        self.files: Dict[str, ManifestEntry] = files or {}
+
+    @classmethod
+    def load(cls, path: str) -> "Manifest":
+        with open(path, "r") as f:
+            data = json.load(f)
+        if data.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"Unsupported manifest version in {path}")
+
+        root = os.path.join(os.path.dirname(os.path.abspath(path)), data["root"])
+        files = {
+            name: ManifestEntry(content_hash, [tuple(comment) for comment in comments])
+            for name, (content_hash, comments) in data["files"].items()
+        }
+        return cls(root, files)
+
+    def save(self, path: str):
+        """
+        Writes the manifest, replacing any existing file in one step
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        data = dict(
+            version=MANIFEST_VERSION,
+            root=os.path.relpath(self.root, directory),
+            files={name: [entry.hash, entry.comments] for name, entry in sorted(self.files.items())},
+        )
+        with NamedTemporaryFile("w", dir=directory, prefix=".tmp-", suffix=".json", delete=False) as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(f.name, path)
+
+    def comments(self, path: str) -> List[Comment]:
+        """
+        Gets the comments of a file, parsing it again if it changed since it was indexed
+
+        Args:
+            path: The file path, absolute or relative to the root
+        """
+        name = self._name(path)
+        full_path = os.path.join(self.root, name)
+        entry = self.files.get(name)
+        if entry is None or entry.hash != file_hash(full_path):
+            return comment_parser.parse(full_path, keep_comments=False, start_line=1, end_line=None)[1]
+        return [_comment(start, end, caption) for start, end, caption in entry.comments]
+
+    def commented_files(self) -> List[str]:
+        """
+        Gets the paths, relative to the root, of the files with comments
+        """
+        return [name for name, entry in sorted(self.files.items()) if entry.comments]
+
+    def update(self, workers: Optional[int] = None, excludes: Iterable[str] = DEFAULT_EXCLUDES) -> IndexStats:
+        """
+        Indexes the source files under the root in a process pool. Files whose content hash is
+        unchanged keep their entry without being parsed.
+
+        Args:
+            workers: The number of processes, defaults to the number of CPUs
+            excludes: Glob patterns of file and directory names to skip
+        """
+        names = list(find_sources(self.root, excludes))
+        jobs = [
+            (os.path.join(self.root, name), self.files[name].hash if name in self.files else None) for name in names
+        ]
+        if workers == 1:
+            results = list(map(_index_file, jobs))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_index_file, jobs, chunksize=_CHUNK_SIZE))
+
+        files: Dict[str, ManifestEntry] = {}
+        parsed = unchanged = skipped = 0
+        for name, result in zip(names, results):
+            if result is None:
+                skipped += 1
+            elif result.comments is None:
+                files[name] = self.files[name]
+                unchanged += 1
+            else:
+                files[name] = result
+                parsed += 1
+        self.files = files
+        return IndexStats(parsed, unchanged, skipped)
+
+    def _name(self, path: str) -> str:
+        if os.path.isabs(path):
+            path = os.path.relpath(path, self.root)
+        return path.replace(os.sep, "/")
+
+
+def load_manifest(path: str = DEFAULT_MANIFEST) -> Manifest:
+    """
+    Loads a manifest, reusing the last load for as long as the file doesn't change
+
+    Args:
+        path: The manifest file path
+    """
+    key = file_key(path)
+    manifest = _manifests.get(key)
+    if manifest is None:
+        manifest = Manifest.load(path)
+        _manifests.put(key, manifest)
+    return manifest
+
+
+def find_sources(root: str, excludes: Iterable[str] = DEFAULT_EXCLUDES) -> Iterator[str]:
+    """
+    Finds the files under a directory that Pygments can highlight
+
+    Args:
+        root: The directory to search
+        excludes: Glob patterns of file and directory names to skip
+
+    Returns:
+        The file paths relative to the root, with `/` separators
+    """
+    excludes = list(excludes)
+    for directory, dirs, files in os.walk(root):
+        dirs[:] = sorted(name for name in dirs if not any(fnmatch(name, pattern) for pattern in excludes))
+        for name in sorted(files):
+            if any(fnmatch(name, pattern) for pattern in excludes) or not find_lexer_class_for_filename(name):
+                continue
+            yield os.path.relpath(os.path.join(directory, name), root).replace(os.sep, "/")
+
+
+def _index_file(job: Tuple[str, Optional[str]]) -> Optional[ManifestEntry]:
+    # runs in the worker processes, returning an entry without comments if the file is unchanged
+    path, known_hash = job
+    try:
+        content_hash = file_hash(path)
+        if content_hash == known_hash:
+            return ManifestEntry(content_hash, None)
+        comments = comment_parser.parse(path, keep_comments=False, start_line=1, end_line=None)[1]
+        # warms the on-disk symbol cache for highlighting by name
+        symbols.index_symbols(path)
+    except (OSError, UnicodeDecodeError):
+        return None
+    return ManifestEntry(content_hash, [(comment.start, comment.end, comment.caption) for comment in comments])
+
+
+def _comment(start: int, end: int, caption: str) -> Comment:
+    comment = Comment()
+    comment.lines = caption.split("\n")
+    comment.start = start
+    comment.end = end
+    return comment
@@ -1,40 +1,132 @@
-from tempfile import NamedTemporaryFile
+import os
+from typing import Iterable
 
-try:
-    import librosa
-except OSError as e:
-    print(f"Error importing sound: {e}")
-from pydub import AudioSegment
+import ffmpeg
+import numpy as np
+from numpy.typing import ArrayLike
+
+from code_video.cache import cache_key
+from code_video.cache import DiskCache
+from code_video.cache import file_hash
+
+DEFAULT_SAMPLE_RATE = 22050
+
+DEFAULT_START_BPM = 60
+
+_beat_cache = DiskCache("beats", max_size=16 * 1024 * 1024)
+
+_audio_cache = DiskCache("audio", max_size=256 * 1024 * 1024)
+
+
+class BeatGrid:
+    """
+    The beat, off beat and measure times of a track, with binary search lookups
+    """
+
+    def __init__(self, beat_times: Iterable[float]):
+        """
+        Args:
+            beat_times: The sorted beat times in seconds
+        """
+        self.beats = np.asarray(beat_times, dtype=np.float64)
+        self.off_beats = (self.beats[:-1] + self.beats[1:]) / 2
+        self.measures = self.off_beats[::2]
+
+    def next_beats(self, times: ArrayLike) -> np.ndarray:
+        """
+        Finds the first beat at or after each of the given times
+
+        Args:
+            times: The times in seconds
+        """
+        idx = np.searchsorted(self.beats, times, side="left")
+        if np.any(idx >= len(self.beats)):
+            raise ValueError("No more music")
+        return self.beats[idx]
+
+    def next_measures(self, times: ArrayLike) -> np.ndarray:
+        """
+        Finds the first measure at or after each of the given times, or the time itself if
+        the music has run out
+
+        Args:
+            times: The times in seconds
+        """
+        times = np.asarray(times, dtype=np.float64)
+        if not len(self.measures):
+            return times
+        idx = np.searchsorted(self.measures, times, side="left")
+        found = idx < len(self.measures)
+        return np.where(found, self.measures[np.minimum(idx, len(self.measures) - 1)], times)
 
 
 class BackgroundMusic:
-    def __init__(self, file: str):
+    def __init__(self, file: str, start_bpm: float = DEFAULT_START_BPM, sample_rate: int = DEFAULT_SAMPLE_RATE):
         self.file = file
-        x, sr = librosa.load(file)
-        _, self.beat_times = librosa.beat.beat_track(x, sr=sr, start_bpm=60, units="time")
-        self.beat_times = [0] + self.beat_times.tolist()
-        self.off_beat_times = []
-        for idx, time in enumerate(self.beat_times[::2]):
-            if len(self.beat_times) >= idx:
-                self.off_beat_times.append((self.beat_times[idx] + self.beat_times[idx + 1]) / 2)
-        self.measure_times = self.off_beat_times[::2]
-
-    def next_beat(self, time):
-        for item in self.beat_times:
-            if item >= time:
-                return time + item - time
-        raise ValueError("No more music")
-
-    def next_measure(self, time):
-        for item in self.measure_times:
-            if item >= time:
-                return item
-        return time
-
-
-def fit_audio(file: str, length: float) -> str:
-    extension = file.split(".")[-1]
-    segment = AudioSegment.from_file(file, extension)[: length * 1000].fade_out(1000)
-    tmp = NamedTemporaryFile(suffix=f".{extension}", delete=False)
-    segment.export(tmp.name, format=extension)
-    return tmp.name
+        key = cache_key(file_hash(file), start_bpm, sample_rate)
+        cached = _beat_cache.get_json(key)
+        if cached:
+            self.grid = BeatGrid(cached["beat_times"])
+            return
+
+        # librosa pulls in numba, scipy and scikit-learn, so only pay for it when analysis is needed
+        import librosa
+
+        x, sr = librosa.load(file, sr=sample_rate)
+        _, beat_times = librosa.beat.beat_track(x, sr=sr, start_bpm=start_bpm, units="time")
+        self.grid = BeatGrid(np.concatenate(([0], beat_times)))
+        _beat_cache.put_json(key, dict(beat_times=self.grid.beats.tolist()))
+
+    @property
+    def beat_times(self) -> np.ndarray:
+        return self.grid.beats
+
+    @property
+    def off_beat_times(self) -> np.ndarray:
+        return self.grid.off_beats
+
+    @property
+    def measure_times(self) -> np.ndarray:
+        return self.grid.measures
+
+    def next_beat(self, time: float) -> float:
+        return float(self.grid.next_beats(time))
+
+    def next_measure(self, time: float) -> float:
+        return float(self.grid.next_measures(time))
+
+
+def fit_audio(file: str, length: float, fade_out: float = 1) -> str:
+    """
+    Trims a music file to the given length and fades out its end. Only the needed part of the
+    file is decoded and the result is cached by the music file contents and length.
+
+    Args:
+        file: The music file path
+        length: The length in seconds
+        fade_out: The length of the fade out in seconds
+
+    Returns:
+        The path of the fitted audio file, owned by the cache
+    """
+    extension = "." + file.split(".")[-1]
+    length = round(length, 3)
+    key = cache_key(file_hash(file), length, fade_out)
+    cached = _audio_cache.get_path(key, extension)
+    if cached:
+        return cached
+
+    with _audio_cache.new_file(extension) as tmp:
+        pass
+    try:
+        (
+            ffmpeg.input(file, t=length)
+            .audio.filter("atrim", duration=length)
+            .filter("afade", type="out", start_time=max(length - fade_out, 0), duration=fade_out)
+            .output(tmp.name)
+            .run(quiet=True, overwrite_output=True)
+        )
+    except ffmpeg.Error:
+        os.remove(tmp.name)
+        raise
+    return _audio_cache.put_file(key, tmp.name, extension)
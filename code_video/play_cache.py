@@ -0,0 +1,151 @@
+"""
+Keys the partial movie files of code_video's own play calls by what they animate. manim names a partial
+movie after a hash of the JSON of the camera, the animations and every mobject in the scene, which is slow
+for large code objects and misses whenever incidental state changes. Instead, these keys are built from a
+description of the step, like the highlighted lines and caption, and a fingerprint of what the scene shows.
+Code rendered by `PartialCode` is fingerprinted by the key of its render, its bounds and checksums of the
+colors of its family, without going over the points of every character.
+"""
+import hashlib
+import itertools
+from contextlib import contextmanager
+from typing import Any
+from typing import Iterator
+from typing import List
+from typing import Optional
+
+from manim import config as manim_config
+from manim import Mobject
+from manim import np
+from manim.renderer import cairo_renderer
+
+from code_video.autoscale import get_bounds
+from code_video.cache import cache_key
+
+# changes whenever the keys mean something else, so old partial movie files are not reused
+_KEY_VERSION = 2
+
+_STYLE_ATTRIBUTES = (
+    "fill_rgbas",
+    "stroke_rgbas",
+    "background_stroke_rgbas",
+    "stroke_width",
+    "background_stroke_width",
+    "sheen_factor",
+    "z_index",
+)
+
+
+@contextmanager
+def cached_plays(*operation: Any) -> Iterator[None]:
+    """
+    Keys the partial movie files of the play calls in a `with` block by a description of the operation
+    they are part of, the order they are played in and a fingerprint of the scene, instead of manim's
+    hash. Play calls in scenes that can't be fingerprinted, like ones with updaters, use manim's hash.
+
+    Args:
+        operation: Values with a stable `repr` that describe the animations played, along with the
+            state of the scene
+    """
+    hash_play_call = cairo_renderer.get_hash_from_play_call
+    plays = itertools.count()
+
+    def get_hash(scene, camera, animations, mobjects):
+        key = play_key(camera, [*mobjects, *scene.foreground_mobjects], operation, next(plays))
+        return key or hash_play_call(scene, camera, animations, mobjects)
+
+    cairo_renderer.get_hash_from_play_call = get_hash
+    try:
+        yield
+    finally:
+        cairo_renderer.get_hash_from_play_call = hash_play_call
+
+
+def play_key(camera, mobjects: List[Mobject], *description: Any) -> Optional[str]:
+    """
+    Builds the partial movie file name of a play call
+
+    Args:
+        camera: The scene's camera
+        mobjects: The mobjects in the scene, including the ones the animations add
+        description: Values with a stable `repr` that describe the animations played
+
+    Returns:
+        The key, or `None` if a mobject can't be fingerprinted
+    """
+    fingerprints = [fingerprint(mobject) for mobject in mobjects]
+    frame = getattr(camera, "frame", None)
+    frame_fingerprint = fingerprint(frame) if frame is not None else ()
+    if frame_fingerprint is None or any(found is None for found in fingerprints):
+        return None
+    camera_state = (
+        type(camera).__name__,
+        camera.pixel_width,
+        camera.pixel_height,
+        manim_config["frame_rate"],
+        str(camera.background_color),
+        camera.background_opacity,
+        frame_fingerprint,
+    )
+    return f"codevidgen_{cache_key(_KEY_VERSION, description, camera_state, fingerprints)}"
+
+
+def fingerprint(mobject: Mobject) -> Optional[tuple]:
+    """
+    Summarizes how a mobject looks from checksums of its points and its style, without serializing them
+
+    Returns:
+        The fingerprint, or `None` if the mobject changes on its own through updaters
+    """
+    if mobject.updaters:
+        return None
+
+    render_key = getattr(mobject, "render_key", None)
+    if render_key is not None:
+        if mobject.get_family_updaters():
+            return None
+        return render_key, _round(get_bounds(mobject).box), _style_checksum(mobject)
+
+    parts: List[Any] = [type(mobject).__name__, _checksum(mobject.points)]
+    for name in _STYLE_ATTRIBUTES:
+        value = getattr(mobject, name, None)
+        if value is not None:
+            parts.append(_round(value))
+    pixels = getattr(mobject, "pixel_array", None)
+    if pixels is not None:
+        parts.append(hashlib.sha1(np.ascontiguousarray(pixels)).hexdigest())
+    for submobject in mobject.submobjects:
+        found = fingerprint(submobject)
+        if found is None:
+            return None
+        parts.append(found)
+    return tuple(parts)
+
+
+def _style_checksum(mobject: Mobject) -> tuple:
+    # colors and opacities can be changed by any animation, so they are summed over the whole family
+    totals = np.array(
+        [
+            np.sum(value)
+            for member in mobject.get_family()
+            for value in (getattr(member, "fill_rgbas", None), getattr(member, "stroke_rgbas", None))
+            if value is not None
+        ],
+        dtype=float,
+    )
+    if not len(totals):
+        return ()
+    weights = np.arange(1, len(totals) + 1)
+    return _round(totals.sum()), _round(weights @ totals)
+
+
+def _checksum(points: np.ndarray) -> tuple:
+    # the weighted sum tells apart the same points in a different order
+    if not len(points):
+        return ()
+    weights = np.arange(1, len(points) + 1)
+    return len(points), _round(points.sum(axis=0)), _round(weights @ points), _round(np.square(points).sum())
+
+
+def _round(value: Any) -> Any:
+    return np.round(np.asarray(value, dtype=float), 6).tolist()
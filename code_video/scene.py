@@ -1,11 +1,19 @@
 from __future__ import annotations
 
 import os
+from bisect import bisect_left
+from bisect import bisect_right
+from contextlib import contextmanager
+from typing import Dict
+from typing import Iterator
+from typing import List
 from typing import Optional
+from typing import Tuple
 from typing import Union
 
 from manim import ApplyMethod
 from manim import Code
+from manim import config as manim_config
 from manim import DEFAULT_WAIT_TIME
 from manim import DOWN
 from manim import FadeIn
@@ -18,15 +26,25 @@ from manim import Text
 from manim import UP
 from manim import WHITE
 from manim.animation.creation import Create
+from manim.utils.exceptions import EndSceneEarlyException
+from manim.utils.file_ops import open_media_file
 
 from code_video import comment_parser
+from code_video import symbols
 from code_video.autoscale import AutoScaled
+from code_video.cache import file_key
+from code_video.code_walkthrough import CodeViewport
 from code_video.code_walkthrough import HighlightLines
 from code_video.code_walkthrough import HighlightNone
 from code_video.code_walkthrough import PartialCode
+from code_video.code_walkthrough import TransformCode
+from code_video.diff import read_version
 from code_video.layout import ColumnLayout
 from code_video.music import BackgroundMusic
 from code_video.music import fit_audio
+from code_video.play_cache import cached_plays
+from code_video.sections import render_sections
+from code_video.sections import Section
 from code_video.widgets import DEFAULT_FONT
 from code_video.widgets import TextBox
 from code_video_cli import config
@@ -55,6 +73,14 @@ class CodeScene(MovingCameraScene):
         self.col_width = None
         self.music: Optional[BackgroundMusic] = None
         self.pauses = {}
+        self.sections: List[Section] = []
+        # the play calls to render, when rendering a single part of the scene
+        self.play_range: Optional[Tuple[int, int]] = None
+        self._section: Optional[str] = None
+        # the files read while constructing the scene, with their `file_key` when first read
+        self.dependencies: Dict[str, Optional[Tuple[str, int, int]]] = {}
+        # the files added with add_sound, including while animations are skipped
+        self.sounds: List[str] = []
 
     def setup(self):
         super().setup()
@@ -71,9 +97,77 @@ class CodeScene(MovingCameraScene):
             path: The file path of the music file, usually an mp3 file.
 
         """
+        self.add_dependency(path)
         self.music = BackgroundMusic(path)
         return self
 
+    def add_dependency(self, path: str):
+        """
+        Records a file the scene reads, so `codevidgen watch` renders the scene again when it changes
+
+        Args:
+            path: The file path
+        """
+        path = os.path.abspath(path)
+        if path not in self.dependencies:
+            # keyed before the file is read, so changes saved while rendering are seen as changes
+            try:
+                self.dependencies[path] = file_key(path)
+            except OSError:
+                self.dependencies[path] = None
+
+    def render(self, preview=False):
+        """
+        Renders the scene, with each section in its own process if the codevidgen script is used with
+        the "--jobs" flag and the scene doesn't add sounds
+        """
+        workers = config.get("section_workers")
+        writes_movie = manim_config["write_to_movie"] and manim_config["format"] != "gif"
+        if workers and workers != 1 and writes_movie and not config.get("show_slides"):
+            random_seed = self.random_seed if self.random_seed is not None else 0
+            file_writer = self.renderer.file_writer
+            if render_sections(type(self), file_writer.movie_file_path, workers, random_seed):
+                file_writer.print_file_ready_message(file_writer.movie_file_path)
+                if preview or manim_config["preview"]:
+                    open_media_file(file_writer)
+                return
+        return super().render(preview)
+
+    @contextmanager
+    def section(self, name: str) -> Iterator[None]:
+        """
+        Marks the animations played in a `with` block as a section. When rendering with "--jobs",
+        each section renders in its own process. Sections inside a section are part of it.
+
+        Args:
+            name: The name of the section
+        """
+        if self._section is not None:
+            yield
+            return
+
+        self._section = name
+        start = self.renderer.num_plays
+        try:
+            yield
+        finally:
+            self._section = None
+        if self.renderer.num_plays > start:
+            self.sections.append(Section(name, start, self.renderer.num_plays))
+
+    def add_sound(self, sound_file, time_offset=0, gain=None, **kwargs):
+        self.sounds.append(sound_file)
+        super().add_sound(sound_file, time_offset, gain, **kwargs)
+
+    def _scene_index(self, mobject) -> Optional[int]:
+        # tells apart which mobject a step animates, as what they all look like is already part of its key
+        return next((index for index, found in enumerate(self.mobjects) if found is mobject), None)
+
+    def play(self, *args, **kwargs):
+        if self.play_range and self.renderer.num_plays >= self.play_range[1]:
+            raise EndSceneEarlyException()
+        super().play(*args, **kwargs)
+
     def tear_down(self):
         super().tear_down()
         if self.music:
@@ -84,7 +178,6 @@ class CodeScene(MovingCameraScene):
                 self.add_sound(file, time_offset=-1 * self.renderer.time)
             finally:
                 self.renderer.skip_animations = old
-            os.remove(file)
 
         if self.pauses:
             config["slide_videos"] = self.renderer.file_writer.partial_movie_files[:]
@@ -94,13 +187,18 @@ class CodeScene(MovingCameraScene):
     def wait(self, duration=DEFAULT_WAIT_TIME, stop_condition=None):
         """
         Either waits like normal or if the codevidgen script is used and the "--slides" flag is used,
-        it will treat these calls as breaks between slides
+        it will treat these calls as breaks between slides. Waits without a stop condition are cached by
+        their duration and what the scene shows.
         """
         if config.get("show_slides"):
             print("In slide mode, skipping wait")
-            super().wait(0.5)
+            with cached_plays("wait", 0.5):
+                super().wait(0.5)
             index = len(self.renderer.file_writer.partial_movie_files) - 1
             self.pauses[index] = []
+        elif stop_condition is None:
+            with cached_plays("wait", duration):
+                super().wait(duration)
         else:
             super().wait(duration, stop_condition)
 
@@ -138,7 +236,7 @@ class CodeScene(MovingCameraScene):
         Args:
             path: The file path of the image file
         """
-
+        self.add_dependency(path)
         background = ImageMobject(path)
         background.height = self.renderer.camera.frame_height
         background.stretch_to_fit_width(self.renderer.camera.frame_width)
@@ -153,6 +251,7 @@ class CodeScene(MovingCameraScene):
         start_line: int = 1,
         end_line: Optional[int] = None,
         reset_at_end: bool = True,
+        viewport_lines: Optional[int] = None,
     ) -> Code:
         """
         Parses a code file, displays it or a section of it, and animates comments
@@ -164,12 +263,103 @@ class CodeScene(MovingCameraScene):
             start_line: The start line number, used for displaying only a partial file
             end_line: The end line number, defaults to the end of the file
             reset_at_end: Whether to reset the code to full screen at the end or not
+            viewport_lines: If set, only show this many lines at a time and scroll to each comment
         """
-        code, comments = comment_parser.parse(
+        self.add_dependency(path)
+        parsed = comment_parser.parse_file(
             path, keep_comments=keep_comments, start_line=start_line, end_line=end_line
         )
 
-        tex = AutoScaled(PartialCode(code=code, start_line=start_line, style=self.code_theme))
+        extension = path.split(".")[-1]
+        if viewport_lines:
+            tex = AutoScaled(
+                CodeViewport(
+                    code=parsed.code,
+                    extension=extension,
+                    start_line=start_line,
+                    tokens=parsed.tokens,
+                    visible_lines=viewport_lines,
+                    style=self.code_theme,
+                )
+            )
+        else:
+            tex = AutoScaled(
+                PartialCode(
+                    code=parsed.code,
+                    extension=extension,
+                    start_line=start_line,
+                    tokens=parsed.tokens,
+                    style=self.code_theme,
+                )
+            )
+        tex.source_path = path
+        tex.source_line_numbers = parsed.line_numbers
+        if title is None:
+            title = path
+
+        with self.section(title):
+            title = Text(title, color=WHITE).to_edge(edge=UP)
+            self.add(title)
+            tex.next_to(title, DOWN)
+
+            with cached_plays("create"):
+                self.play(Create(tex))
+            self.wait()
+
+            for comment in parsed.comments:
+                self.highlight_lines(tex, comment.start, comment.end, comment.caption)
+
+            with cached_plays("reset_code", self._scene_index(tex), reset_at_end):
+                if self.caption:
+                    self.play(FadeOut(self.caption))
+                    self.caption = None
+
+                if reset_at_end:
+                    self.play(HighlightNone(tex))
+                    self.play(ApplyMethod(tex.full_size))
+        return tex
+
+    def animate_code_diff(
+        self,
+        old: str,
+        new: Optional[str] = None,
+        path: Optional[str] = None,
+        title: str = None,
+        highlight: bool = True,
+    ) -> Code:
+        """
+        Displays a version of a code file and animates the changes to another version of it
+
+        Args:
+            old: The old file path, or the old git revision if `path` is set
+            new: The new file path, or the new git revision if `path` is set, defaults to the file on disk
+            path: The source code file path, when comparing two git revisions of it
+            title: The title or file path if not provided
+            highlight: Whether to highlight the changed lines afterwards
+        """
+        if path:
+            self.add_dependency(path)
+            old_lines, new_lines = read_version(path, old), read_version(path, new)
+            new_path = path if new is None else None
+            if title is None:
+                title = f"{path} {old}..{new or ''}"
+        elif new:
+            self.add_dependency(old)
+            self.add_dependency(new)
+            old_lines, new_lines = read_version(old), read_version(new)
+            new_path = path = new
+        else:
+            raise ValueError("Must define the new file path, or the path of the file to compare revisions of")
+
+        extension = path.split(".")[-1]
+        tex = AutoScaled(
+            PartialCode(
+                code=[line.text for line in old_lines],
+                extension=extension,
+                tokens=[line.tokens for line in old_lines],
+                style=self.code_theme,
+            )
+        )
         if title is None:
             title = path
 
@@ -180,16 +370,14 @@ class CodeScene(MovingCameraScene):
         self.play(Create(tex))
         self.wait()
 
-        for comment in comments:
-            self.highlight_lines(tex, comment.start, comment.end, comment.caption)
+        transform = TransformCode(tex, old_lines, new_lines, extension)
+        self.play(transform)
+        tex.source_path = new_path
+        tex.source_line_numbers = None
+        self.play(ApplyMethod(tex.full_size))
 
-        if self.caption:
-            self.play(FadeOut(self.caption))
-            self.caption = None
-
-        if reset_at_end:
-            self.play(HighlightNone(tex))
-            self.play(ApplyMethod(tex.full_size))
+        if highlight and transform.changed_lines:
+            self.play(HighlightLines(tex, *transform.changed_lines))
         return tex
 
     def highlight_lines(self, code: Code, start: int = 1, end: int = -1, caption: Optional[str] = None):
@@ -203,41 +391,50 @@ class CodeScene(MovingCameraScene):
             caption: The text to display with the highlight
         """
 
-        if end == -1:
-            end = len(code.line_numbers) + code.line_no_from
-
-        layout = ColumnLayout(columns=3)
-
-        actions = []
-        if caption and not self.caption:
-            self.play(
-                ApplyMethod(
-                    code.fill_between_x,
-                    layout.get_x(1, span=2, direction=LEFT),
-                    layout.get_x(1, span=2, direction=RIGHT),
+        # the keys of the partial movies only depend on the step and what is shown, so changing a caption
+        # only renders the highlights showing it again
+        with cached_plays("highlight_lines", self._scene_index(code), start, end, caption):
+            if isinstance(code, CodeViewport):
+                if end == -1:
+                    end = code.last_line_no
+                scroll = code.scroll_to(start, end)
+                if scroll:
+                    self.play(scroll)
+            elif end == -1:
+                end = len(code.line_numbers) + code.line_no_from
+
+            layout = ColumnLayout(columns=3)
+
+            actions = []
+            if caption and not self.caption:
+                self.play(
+                    ApplyMethod(
+                        code.fill_between_x,
+                        layout.get_x(1, span=2, direction=LEFT),
+                        layout.get_x(1, span=2, direction=RIGHT),
+                    )
                 )
-            )
 
-        if self.caption:
-            actions.append(FadeOut(self.caption))
-            self.caption = None
+            if self.caption:
+                actions.append(FadeOut(self.caption))
+                self.caption = None
 
-        if not caption:
-            self.play(ApplyMethod(code.full_size))
-        else:
-            callout = TextBox(caption, text_attrs=dict(size=0.4, font=DEFAULT_FONT))
-            callout.align_to(code.line_numbers[start - code.line_no_from], UP)
-            callout.set_x(layout.get_x(3), LEFT)
-            actions += [HighlightLines(code, start, end), FadeIn(callout)]
-            self.caption = callout
+            if not caption:
+                self.play(ApplyMethod(code.full_size))
+            else:
+                callout = TextBox(caption, text_attrs=dict(size=0.4, font=DEFAULT_FONT))
+                callout.align_to(code.line_numbers[start - code.line_no_from], UP)
+                callout.set_x(layout.get_x(3), LEFT)
+                actions += [HighlightLines(code, start, end), FadeIn(callout)]
+                self.caption = callout
 
-        self.play(*actions)
+            self.play(*actions)
 
-        if not self.caption:
-            self.play(ApplyMethod(code.full_size))
-        else:
-            wait_time = len(self.caption.text) / (200 * 5 / 60)
-            self.wait_until_measure(wait_time, -1.5)
+            if not self.caption:
+                self.play(ApplyMethod(code.full_size))
+            else:
+                wait_time = len(self.caption.text) / (200 * 5 / 60)
+                self.wait_until_measure(wait_time, -1.5)
 
     def highlight_line(self, code: Code, number: int = -1, caption: Optional[str] = None):
         """
@@ -250,6 +447,31 @@ class CodeScene(MovingCameraScene):
         """
         return self.highlight_lines(code, number, number, caption=caption)
 
+    def highlight_symbol(self, code: Code, name: str, caption: Optional[str] = None):
+        """
+        Convenience method for highlighting a function, class or method by name, which keeps working
+        as the lines of the file change
+
+        Args:
+            code: The code object, must be wrapped in `AutoScaled` and created from a file
+            name: The dotted name of the symbol, like `MyClass.method`
+            caption: The text to display with the highlight
+        """
+        path = getattr(code, "source_path", None) or getattr(code, "file_path", None)
+        if not path:
+            raise ValueError("Symbols can only be highlighted in code created from a file")
+
+        start, end = symbols.find_symbol(path, name)
+        line_numbers = getattr(code, "source_line_numbers", None)
+        if line_numbers:
+            # stripped comments shift the displayed line numbers away from the file's
+            first = code.first_line_no if isinstance(code, CodeViewport) else code.line_no_from
+            shown_start, shown_end = bisect_left(line_numbers, start), bisect_right(line_numbers, end) - 1
+            if shown_start > shown_end:
+                raise ValueError(f"{name} is not part of the displayed code")
+            start, end = first + shown_start, first + shown_end
+        return self.highlight_lines(code, start, end, caption=caption)
+
     def highlight_none(self, code: Code):
         """
         Convenience method for resetting any existing highlighting.
@@ -257,17 +479,24 @@ class CodeScene(MovingCameraScene):
         Args:
             code: The code object, must be wrapped in `AutoScaled`
         """
-        if self.caption:
-            self.play(FadeOut(self.caption), HighlightNone(code))
-            self.caption = None
+        with cached_plays("highlight_none", self._scene_index(code)):
+            if self.caption:
+                self.play(FadeOut(self.caption), HighlightNone(code))
+                self.caption = None
 
-        self.play(ApplyMethod(code.full_size))
+            self.play(ApplyMethod(code.full_size))
 
-    def create_code(self, path: str, **kwargs) -> Code:
+    def create_code(self, path: str, viewport_lines: Optional[int] = None, **kwargs) -> Code:
         """
         Convenience method for creating an autoscaled code object.
 
         Args:
             path: The source code file path
+            viewport_lines: If set, only show this many lines at a time, scrolling to highlighted lines
         """
-        return AutoScaled(Code(path, font=self.code_font, style=self.code_theme, **kwargs))
+        self.add_dependency(path)
+        if viewport_lines:
+            return AutoScaled(
+                CodeViewport(path, visible_lines=viewport_lines, font=self.code_font, style=self.code_theme, **kwargs)
+            )
+        return AutoScaled(PartialCode(path, font=self.code_font, style=self.code_theme, **kwargs))
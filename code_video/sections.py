@@ -0,0 +1,187 @@
+"""
+Renders the sections of a `CodeScene` in parallel and joins their partial movie files in order.
+Every worker runs the scene from the start, skipping the animations before its section, so each
+section starts from the same state as it would in a serial render.
+"""
+from __future__ import annotations
+
+import importlib.util
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from tempfile import NamedTemporaryFile
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+from typing import Type
+from typing import TYPE_CHECKING
+
+import ffmpeg
+from manim import config as manim_config
+from manim import tempconfig
+from manim.utils.exceptions import EndSceneEarlyException
+
+from code_video.music import fit_audio
+
+if TYPE_CHECKING:
+    from code_video.scene import CodeScene
+
+
+# the manim options workers render with, passed along so they don't depend on how the process was started
+_CONFIG_KEYS = (
+    "assets_dir",
+    "background_color",
+    "background_opacity",
+    "custom_folders",
+    "disable_caching",
+    "ffmpeg_loglevel",
+    "format",
+    "frame_height",
+    "frame_rate",
+    "frame_width",
+    "images_dir",
+    "input_file",
+    "max_files_cached",
+    "media_dir",
+    "movie_file_extension",
+    "partial_movie_dir",
+    "pixel_height",
+    "pixel_width",
+    "progress_bar",
+    "tex_dir",
+    "tex_template_file",
+    "text_dir",
+    "verbosity",
+    "video_dir",
+    "write_to_movie",
+)
+
+
+class Section(NamedTuple):
+    name: str
+    # the index of the first play call in the section, and of the first one after it
+    start: int
+    end: int
+
+
+class _Job(NamedTuple):
+    module: str
+    path: str
+    scene: str
+    random_seed: int
+    start: int
+    end: int
+    options: Dict[str, Any]
+
+
+def split_plays(sections: List[Section], num_plays: int) -> List[Tuple[int, int]]:
+    """
+    Splits the play calls of a scene into the ranges to render separately, one per section and one
+    for each run of play calls between sections
+
+    Args:
+        sections: The sections in the order they were played
+        num_plays: The number of play calls in the scene
+    """
+    ranges = []
+    position = 0
+    for section in sections:
+        if section.start > position:
+            ranges.append((position, section.start))
+        ranges.append((section.start, section.end))
+        position = section.end
+    if num_plays > position:
+        ranges.append((position, num_plays))
+    return ranges
+
+
+def render_sections(
+    scene_class: Type[CodeScene], movie_file_path: str, workers: Optional[int] = None, random_seed: int = 0
+) -> bool:
+    """
+    Renders a scene with each of its sections in its own process
+
+    Args:
+        scene_class: The scene to render
+        movie_file_path: The path of the movie to write
+        workers: The number of processes, defaults to the number of CPUs
+        random_seed: The seed every process starts from, so they all build the same scene
+
+    Returns:
+        Whether the scene was rendered, or `False` if it has fewer than two parts to render or adds
+        sounds, which only the process rendering them would hear
+    """
+    planner = scene_class(random_seed=random_seed, skip_animations=True)
+    planner.setup()
+    try:
+        planner.construct()
+    except EndSceneEarlyException:
+        pass
+    ranges = split_plays(planner.sections, planner.renderer.num_plays)
+    if len(ranges) < 2 or planner.sounds:
+        return False
+
+    module = sys.modules[scene_class.__module__]
+    options = {key: manim_config[key] for key in _CONFIG_KEYS}
+    # colors can't be pickled
+    options["background_color"] = manim_config["background_color"].hex_l
+    jobs = [
+        _Job(module.__name__, module.__file__, scene_class.__qualname__, random_seed, start, end, options)
+        for start, end in ranges
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        partial_movie_files = [path for paths in executor.map(_render_range, jobs) for path in paths]
+
+    _concat_movies(partial_movie_files, movie_file_path)
+    if planner.music:
+        _add_audio(movie_file_path, fit_audio(planner.music.file, planner.renderer.time + 2))
+    return True
+
+
+def _render_range(job: _Job) -> List[str]:
+    # runs in the worker processes, returning the partial movie files of the rendered play calls
+    module = sys.modules.get(job.module)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(job.module, job.path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[job.module] = module
+        spec.loader.exec_module(module)
+
+    with tempconfig(dict(job.options, from_animation_number=job.start, upto_animation_number=-1)):
+        scene = getattr(module, job.scene)(random_seed=job.random_seed)
+        scene.play_range = (job.start, job.end)
+        scene.setup()
+        try:
+            scene.construct()
+        except EndSceneEarlyException:
+            pass
+    return [path for path in scene.renderer.file_writer.partial_movie_files if path is not None]
+
+
+def _concat_movies(paths: List[str], movie_file_path: str):
+    with NamedTemporaryFile(mode="w", suffix=".txt", delete=False) as file:
+        for path in paths:
+            file.write(f"file '{os.path.abspath(path)}'\n")
+    try:
+        (
+            ffmpeg.input(file.name, format="concat", safe=0)
+            .output(movie_file_path, c="copy")
+            .run(quiet=True, overwrite_output=True)
+        )
+    finally:
+        os.remove(file.name)
+
+
+def _add_audio(movie_file_path: str, audio_file_path: str):
+    base, extension = os.path.splitext(movie_file_path)
+    temp_file_path = f"{base}_temp{extension}"
+    video = ffmpeg.input(movie_file_path)
+    audio = ffmpeg.input(audio_file_path)
+    output = ffmpeg.output(
+        video.video, audio.audio, temp_file_path, vcodec="copy", acodec="aac", audio_bitrate="320k"
+    )
+    output.run(quiet=True, overwrite_output=True)
+    os.replace(temp_file_path, movie_file_path)
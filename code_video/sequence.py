@@ -1,28 +1,34 @@
 from __future__ import annotations
 
+from collections import deque
+from functools import partial
 from textwrap import wrap
+from typing import Callable
+from typing import Deque
 from typing import Dict
 from typing import Iterable
+from typing import Iterator
 from typing import List
 from typing import Optional
 
 from manim import Arrow
 from manim import DashedLine
+from manim import DEFAULT_ARROW_TIP_LENGTH
 from manim import DEFAULT_STROKE_WIDTH
 from manim import DOWN
 from manim import ITALIC
 from manim import LEFT
 from manim import MED_LARGE_BUFF
 from manim import MED_SMALL_BUFF
+from manim import np
 from manim import RIGHT
-from manim import Text
 from manim import UP
 from manim import VGroup
 from manim import WHITE
 from manim.mobject.geometry import DEFAULT_DASH_LENGTH
 from manim.mobject.geometry import Polygon
-from numba import np
 
+from code_video.widgets import cached_text
 from code_video.widgets import DEFAULT_FONT
 from code_video.widgets import NoteBox
 from code_video.widgets import TextBox
@@ -64,7 +70,6 @@ class Actor(VGroup):
             stroke_width=DEFAULT_STROKE_WIDTH / 2,
             positive_space_ratio=0.5,
         )
-        self.bblock = self.block.copy()
         self.bblock.next_to(self.line, direction=DOWN, buff=0)
         self.add(self.line, self.bblock)
 
@@ -79,10 +84,9 @@ class Actor(VGroup):
         """
 
         if self == target:
-            interaction = SelfArrow(self, message)
+            self.diagram.queue_interaction(partial(SelfArrow, self, message))
         else:
-            interaction = ActorArrow(self, target, message if message else "")
-        self.diagram.add_interaction(interaction)
+            self.diagram.queue_interaction(partial(ActorArrow, self, target, message if message else ""))
         return self
 
     def note(self, message: str):
@@ -92,8 +96,7 @@ class Actor(VGroup):
         Args:
             message: The text of the note
         """
-        note_interaction = Note(self, message, RIGHT)
-        self.diagram.add_interaction(note_interaction)
+        self.diagram.queue_interaction(partial(Note, self, message, RIGHT))
         return self
 
     def __str__(self):
@@ -116,26 +119,31 @@ class ActorArrow(Interaction):
         self.target = target
         self.label = label
         self.font = font
+        self._scale = 1.0
 
-        line = Arrow(
-            start=[self.source.get_center()[0], 0, 0],
-            end=[self.target.get_center()[0], 0, 0],
-            buff=0,
-            stroke_width=ARROW_STROKE_WIDTH,
-        )
-        text = Text(self.label, font=self.font, size=0.5, slant=ITALIC)
+        line = self._build_line(0)
+        text = cached_text(self.label, font=self.font, size=0.5, slant=ITALIC)
         text.next_to(line, direction=UP, buff=0)
         self.add(line, text)
 
     def scale(self, scale_factor, **kwargs):
         super().scale(scale_factor, **kwargs)
-        self.submobjects[0].align_to(
-            self.source.get_center(),
-            direction=LEFT if self.source.get_center()[0] < self.target.get_center()[0] else RIGHT,
-        )
-        self.submobjects[1].next_to(self.submobjects[0], direction=UP, buff=0)
+        self._scale *= scale_factor
+        # the lifelines may already have been scaled when the arrow was built, so span them again
+        line = self._build_line(self.submobjects[0].get_y())
+        self.submobjects[0] = line
+        self.submobjects[1].next_to(line, direction=UP, buff=0)
         return self
 
+    def _build_line(self, y: float) -> Arrow:
+        return Arrow(
+            start=[self.source.get_center()[0], y, 0],
+            end=[self.target.get_center()[0], y, 0],
+            buff=0,
+            stroke_width=ARROW_STROKE_WIDTH,
+            tip_length=DEFAULT_ARROW_TIP_LENGTH * self._scale,
+        )
+
     def __str__(self):
         result = f"Interaction ({self.source.title}->{self.target.title if self.target else '?'})"
         if self.label:
@@ -198,7 +206,7 @@ class SelfArrow(Interaction):
         )
         line_block.add(line, arrow)
 
-        title = Text(self.label, font=self.source.font, size=0.5, slant=ITALIC)
+        title = cached_text(self.label, font=self.source.font, size=0.5, slant=ITALIC)
         title.next_to(line_block)
 
         block = VGroup()
@@ -218,10 +226,19 @@ class SequenceDiagram(VGroup):
     A sequence diagram built using a DSL
     """
 
-    def __init__(self, **kwargs):
+    def __init__(self, page_height: Optional[float] = None, **kwargs):
+        """
+        Args:
+            page_height: If set, the lifelines are this tall and interactions are split into pages of
+                this height, only built once their page is displayed. Use `get_pages` to display them.
+        """
         super().__init__(**kwargs)
+        self.page_height = page_height
         self.actors: Dict[str, Actor] = {}
         self.interactions: List[Interaction] = []
+        self._pending: Deque[Callable[[], Interaction]] = deque()
+        self._interactions_height: float = page_height or 0
+        self._lifelines_stale = False
 
     def add_objects(self, *names: str) -> List[Actor]:
         """
@@ -246,23 +263,87 @@ class SequenceDiagram(VGroup):
             left_x = start_x + actor_width * idx
             actor.set_x(left_x + (actor_width - actor.get_width()) / 2, LEFT)
 
+        if self.page_height:
+            self._lifelines_stale = True
         return self.actors.values()
 
+    def queue_interaction(self, factory: Callable[[], Interaction]):
+        """
+        Adds an interaction, building it straight away unless the diagram is paged
+
+        Args:
+            factory: Builds the interaction
+        """
+        if self.page_height is None:
+            self.add_interaction(factory())
+        else:
+            self._pending.append(factory)
+
     def add_interaction(self, interaction: Interaction):
+        if self.page_height is not None:
+            self._pending.append(lambda: interaction)
+            return interaction
+
         self.interactions.append(interaction)
+        self._interactions_height += interaction.get_height() + 0.5
+        self._lifelines_stale = True
+        return interaction
 
-        for actor in self.actors.values():
-            actor.stretch(sum(item.get_height() + 0.5 for item in self.interactions))
+    def layout_lifelines(self) -> SequenceDiagram:
+        """
+        Stretches the actor lifelines to fit the interactions added so far. This happens automatically
+        the first time the diagram is measured or rendered after adding interactions.
+        """
+        if self._lifelines_stale:
+            self._lifelines_stale = False
+            for actor in self.actors.values():
+                actor.stretch(self._interactions_height)
+        return self
 
-        return interaction
+    def get_family(self, recurse=True):
+        self.layout_lifelines()
+        return super().get_family(recurse)
 
     def get_interactions(self) -> Iterable[Interaction]:
         """
         Gets the pre-programmed interactions for display
         """
+        if self.page_height is not None:
+            raise ValueError("Paged diagrams are displayed with get_pages")
+        return self._place_interactions(self.interactions)
+
+    def get_pages(self) -> Iterator[List[Interaction]]:
+        """
+        Builds and positions the interactions one page at a time, at the diagram's current scale.
+        Only the current page is kept in memory, so remove each page from the scene before moving on:
+
+            for page in diagram.get_pages():
+                for interaction in page:
+                    self.play(Create(interaction))
+                self.play(FadeOut(*page))
+        """
+        if self.page_height is None:
+            yield list(self.get_interactions())
+            return
+
+        page: List[Interaction] = []
+        page_height = 0.0
+        while self._pending:
+            interaction = self._pending.popleft()()
+            height = interaction.get_height() + 0.5
+            if page and page_height + height > self.page_height:
+                yield list(self._place_interactions(page))
+                page, page_height = [], 0.0
+            page.append(interaction)
+            page_height += height
+
+        if page:
+            yield list(self._place_interactions(page))
+
+    def _place_interactions(self, interactions: Iterable[Interaction]) -> Iterator[Interaction]:
         scale = getattr(self, "_overall_scale_factor", 1)
         last: Interaction = None
-        for interaction in [item for item in self.interactions]:
+        for interaction in list(interactions):
             interaction.scale(scale)
             if not last:
                 interaction.set_y(list(self.actors.values())[0].block.get_y(DOWN) - MED_SMALL_BUFF, direction=UP)
@@ -0,0 +1,190 @@
+"""
+Finds the line ranges of the functions, classes and methods in source files, so code can be
+highlighted by name instead of by line numbers that shift whenever the file changes. Python files
+are indexed from their syntax tree, and other languages from the definitions their Pygments lexer
+marks as functions or classes, or from the names following declaration keywords like `function`.
+"""
+import ast
+import os
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from pygments.token import Comment
+from pygments.token import Keyword
+from pygments.token import Name
+from pygments.token import Operator
+from pygments.token import Punctuation
+
+from code_video import comment_parser
+from code_video.cache import cache_key
+from code_video.cache import DiskCache
+from code_video.cache import file_hash
+from code_video.cache import LRUCache
+from code_video.comment_parser import SourceLine
+
+# bump when the index of a file could come out differently
+_INDEX_VERSION = 2
+
+_CLOSING_LINES = ("end", "end;", "}", "};")
+
+# keywords followed by the name of what they define, for lexers that don't mark definitions, like JavaScript's
+_DECLARATION_KEYWORDS = {"class", "enum", "fn", "fun", "func", "function", "interface", "struct", "trait", "type"}
+
+_symbol_cache = DiskCache("symbols", max_size=16 * 1024 * 1024)
+
+_symbol_indexes = LRUCache(max_size=256)
+
+SymbolIndex = Dict[str, Tuple[int, int]]
+
+
+def index_symbols(path: str) -> SymbolIndex:
+    """
+    Gets the first and last line numbers of every function, class and method in a file, by their
+    dotted name such as `MyClass.method`. Indexes are cached on disk by the file contents.
+
+    Args:
+        path: The source code file path
+    """
+    key = cache_key(file_hash(path), os.path.splitext(path)[1], _INDEX_VERSION)
+    symbols = _symbol_indexes.get(key)
+    if symbols is None:
+        cached = _symbol_cache.get_json(key)
+        if cached is not None:
+            symbols = {name: tuple(lines) for name, lines in cached.items()}
+        else:
+            symbols = _index_file(path)
+            _symbol_cache.put_json(key, symbols)
+        _symbol_indexes.put(key, symbols)
+    return symbols
+
+
+def find_symbol(path: str, name: str) -> Tuple[int, int]:
+    """
+    Gets the first and last line numbers of a function, class or method
+
+    Args:
+        path: The source code file path
+        name: The dotted name of the symbol, like `MyClass.method`
+    """
+    try:
+        return index_symbols(path)[name]
+    except KeyError:
+        raise ValueError(f"No function, class or method named {name} in {path}") from None
+
+
+def _index_file(path: str) -> SymbolIndex:
+    if path.endswith((".py", ".pyi")):
+        with open(path, "r") as f:
+            source = f.read()
+        try:
+            return _python_symbols(ast.parse(source, filename=path))
+        except SyntaxError:
+            pass
+    return _token_symbols(comment_parser.lex(path))
+
+
+def _python_symbols(tree: ast.AST) -> SymbolIndex:
+    symbols: SymbolIndex = {}
+
+    def visit(node: ast.AST, prefix: str):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                name = prefix + child.name
+                start = min([decorator.lineno for decorator in child.decorator_list] + [child.lineno])
+                symbols.setdefault(name, (start, child.end_lineno))
+                visit(child, name + ".")
+            else:
+                visit(child, prefix)
+
+    visit(tree, "")
+    return symbols
+
+
+def _token_symbols(lines: List[SourceLine]) -> SymbolIndex:
+    symbols: SymbolIndex = {}
+    declarations: SymbolIndex = {}
+    # the definitions whose braces are open, with the brace depth inside their body
+    stack: List[Tuple[str, int, int]] = []
+    # the definitions without braces that could still hold others, with their last line
+    blocks: List[Tuple[str, int, int]] = []
+    pending: Optional[Tuple[str, int]] = None
+    depth = 0
+    # after a declaration keyword, the next name is defined, unless it is a Go method receiver like
+    # `func (p *Point) Area()`, where the name defined is the one that follows the receiver and opens a parenthesis
+    declaring: Optional[str] = None
+
+    def close_pending():
+        # a definition without braces, either a declaration or from a language that uses indentation
+        name, start = pending
+        end = _indented_end(lines, start)
+        if end == start:
+            declarations.setdefault(name, (start, end))
+        else:
+            symbols.setdefault(name, (start, end))
+            blocks.append((name, start, end))
+
+    for line_no, line in enumerate(lines, start=1):
+        for index, (token_type, value) in enumerate(line.tokens):
+            if not value.strip() or token_type in Comment:
+                continue
+            if declaring == "receiver":
+                declaring = "receiver" if ")" not in value else "method"
+                continue
+            if declaring == "keyword" and value == "(":
+                declaring = "receiver"
+                continue
+            defines = token_type in Name.Function or token_type in Name.Class
+            if declaring and token_type in Name:
+                following = line.tokens[index + 1][1] if index + 1 < len(line.tokens) else ""
+                defines = declaring == "keyword" or following.startswith("(")
+            declaring = "keyword" if token_type in Keyword and value in _DECLARATION_KEYWORDS else None
+            if defines:
+                if pending:
+                    close_pending()
+                while blocks and blocks[-1][2] < line_no:
+                    blocks.pop()
+                parents = stack[-1:] + blocks[-1:]
+                prefix = max(parents, key=lambda parent: parent[1])[0] + "." if parents else ""
+                pending = (prefix + value.strip(), line_no)
+            elif token_type in Punctuation or token_type in Operator:
+                for char in value:
+                    if char == "{":
+                        depth += 1
+                        if pending:
+                            stack.append((pending[0], pending[1], depth))
+                            pending = None
+                    elif char == "}":
+                        if stack and stack[-1][2] == depth:
+                            name, start, _ = stack.pop()
+                            symbols.setdefault(name, (start, line_no))
+                        depth = max(depth - 1, 0)
+                    elif char == ";" and pending:
+                        declarations.setdefault(pending[0], (pending[1], pending[1]))
+                        pending = None
+
+    if pending:
+        close_pending()
+    for name, start, _ in stack:
+        symbols.setdefault(name, (start, len(lines)))
+    return {**declarations, **symbols}
+
+
+def _indented_end(lines: List[SourceLine], start: int) -> int:
+    def indent(text: str) -> int:
+        return len(text) - len(text.lstrip())
+
+    base = indent(lines[start - 1].text)
+    end = start
+    for line_no in range(start + 1, len(lines) + 1):
+        text = lines[line_no - 1].text
+        if not text.strip():
+            continue
+        if indent(text) > base:
+            end = line_no
+            continue
+        if indent(text) == base and text.strip() in _CLOSING_LINES:
+            end = line_no
+        break
+    return end
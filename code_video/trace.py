@@ -0,0 +1,247 @@
+"""
+Imports recorded request traces as sequence diagrams. Supported files are:
+
+* OpenTelemetry JSON, one export request per line as written by the collector file exporter
+* Zipkin JSON, either a list of spans, a list of traces, or one span per line
+* Newline-delimited event logs, with one `{"source": ..., "target": ..., "message": ...}` object per line
+
+Files are streamed and reduced to compact messages, so large traces never need to be loaded whole.
+"""
+import json
+import re
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import TextIO
+from typing import Tuple
+from typing import Union
+
+from code_video.sequence import SequenceDiagram
+
+OTHER_ACTOR = "Other"
+
+_CHUNK_SIZE = 64 * 1024
+
+_SEPARATORS = re.compile(r"[\s,]*")
+
+
+class Message(NamedTuple):
+    source: str
+    target: str
+    label: str
+    count: int = 1
+
+    @property
+    def text(self) -> str:
+        return f"{self.label} x{self.count}" if self.count > 1 else self.label
+
+
+class _Span(NamedTuple):
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    service: str
+    name: str
+    start: int
+
+
+def load_trace(path: str, max_actors: int = 8, page_height: Optional[float] = None, **kwargs) -> SequenceDiagram:
+    """
+    Builds a sequence diagram from a trace file. Repeated calls are collapsed into one
+    interaction and actors over `max_actors` are grouped together as "Other". The file is
+    streamed twice, once to find the actors and once to add the interactions between them.
+
+    Args:
+        path: The trace file path
+        max_actors: The maximum number of actors in the diagram
+        page_height: The page height for a paged diagram, recommended for long traces
+    """
+    names = find_actors(iter_messages(path), max_actors)
+    diagram = SequenceDiagram(page_height=page_height, **kwargs)
+    actors = dict(zip(names, diagram.add_objects(*names))) if names else {}
+    for message in collapse_repeats(limit_actors(iter_messages(path), names)):
+        actors[message.source].to(actors[message.target], message.text)
+    return diagram
+
+
+def iter_messages(path: str) -> Iterator[Message]:
+    """
+    Streams the messages of a trace file. Event log messages are yielded in file order and
+    messages between spans of different services are yielded in start time order once the
+    file has been read.
+
+    Args:
+        path: The trace file path
+    """
+    spans: List[_Span] = []
+    for record in read_records(path):
+        for item in _parse_record(record):
+            if isinstance(item, Message):
+                yield item
+            else:
+                spans.append(item)
+
+    if spans:
+        yield from _span_messages(spans)
+
+
+def find_actors(messages: Iterable[Message], max_actors: int) -> List[str]:
+    """
+    Gets the actors of the messages in order of appearance. If there are more than `max_actors`,
+    only the first `max_actors - 1` are kept and followed by "Other".
+    """
+    names: Dict[str, None] = {}
+    for message in messages:
+        names.setdefault(message.source)
+        names.setdefault(message.target)
+
+    found = list(names)
+    if len(found) > max_actors:
+        return found[: max_actors - 1] + [OTHER_ACTOR]
+    return found
+
+
+def limit_actors(messages: Iterable[Message], actors: Iterable[str]) -> Iterator[Message]:
+    """
+    Renames the actors that aren't in `actors` to "Other"
+    """
+    kept = set(actors)
+
+    def name(actor: str) -> str:
+        return actor if actor in kept else OTHER_ACTOR
+
+    for message in messages:
+        yield message._replace(source=name(message.source), target=name(message.target))
+
+
+def collapse_repeats(messages: Iterable[Message]) -> Iterator[Message]:
+    """
+    Collapses runs of identical messages into one message with a count
+    """
+    last: Optional[Message] = None
+    for message in messages:
+        if last and message[:3] == last[:3]:
+            last = last._replace(count=last.count + message.count)
+            continue
+        if last:
+            yield last
+        last = message
+    if last:
+        yield last
+
+
+def read_records(path: str) -> Iterator[Any]:
+    """
+    Streams the JSON values of a file holding either one value per line or a single array
+
+    Args:
+        path: The file path
+    """
+    with open(path, "r") as f:
+        first = f.read(1)
+        while first.isspace():
+            first = f.read(1)
+
+        if first == "[":
+            yield from _iter_json_array(f)
+            return
+
+        f.seek(0)
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def _iter_json_array(f: TextIO) -> Iterator[Any]:
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    eof = False
+    while True:
+        position = _SEPARATORS.match(buffer, position).end()
+        if buffer.startswith("]", position):
+            return
+        if position == len(buffer) and eof:
+            raise ValueError("Unterminated JSON array")
+        try:
+            value, end = decoder.raw_decode(buffer, position)
+        except ValueError:
+            value, end = None, -1
+        # a value that ends with the buffer could be cut short, like a number
+        if end == -1 or (end == len(buffer) and not eof):
+            if eof:
+                raise ValueError("Invalid JSON array")
+            # drops the values already decoded, and reads at least as much as is left over, so a value
+            # longer than a chunk is only decoded again a logarithmic number of times
+            buffer = buffer[position:]
+            position = 0
+            chunk = f.read(max(_CHUNK_SIZE, len(buffer)))
+            eof = not chunk
+            buffer += chunk
+            continue
+        yield value
+        position = end
+
+
+def _parse_record(record: Any) -> Iterator[Union[Message, _Span]]:
+    if isinstance(record, list):
+        for item in record:
+            yield from _parse_record(item)
+    elif not isinstance(record, dict):
+        return
+    elif "resourceSpans" in record:
+        yield from _parse_otel(record)
+    elif "traceId" in record and "id" in record:
+        yield _Span(
+            trace_id=record["traceId"],
+            span_id=record["id"],
+            parent_id=record.get("parentId"),
+            service=(record.get("localEndpoint") or {}).get("serviceName", "unknown"),
+            name=record.get("name", ""),
+            start=int(record.get("timestamp", 0)),
+        )
+    else:
+        source = record.get("source", record.get("from"))
+        target = record.get("target", record.get("to"))
+        if source and target:
+            yield Message(str(source), str(target), str(record.get("message", record.get("label", ""))))
+
+
+def _parse_otel(record: Dict[str, Any]) -> Iterator[_Span]:
+    for resource_spans in record["resourceSpans"]:
+        service = _otel_attribute(resource_spans.get("resource", {}), "service.name") or "unknown"
+        scopes = resource_spans.get("scopeSpans") or resource_spans.get("instrumentationLibrarySpans") or []
+        for scope in scopes:
+            for span in scope.get("spans", []):
+                yield _Span(
+                    trace_id=span["traceId"],
+                    span_id=span["spanId"],
+                    parent_id=span.get("parentSpanId") or None,
+                    service=service,
+                    name=span.get("name", ""),
+                    start=int(span.get("startTimeUnixNano", 0)),
+                )
+
+
+def _otel_attribute(resource: Dict[str, Any], key: str) -> Optional[str]:
+    for attribute in resource.get("attributes", []):
+        if attribute.get("key") == key:
+            value = attribute.get("value", {})
+            return value.get("stringValue")
+    return None
+
+
+def _span_messages(spans: List[_Span]) -> Iterator[Message]:
+    services: Dict[Tuple[str, str], str] = {(span.trace_id, span.span_id): span.service for span in spans}
+    spans.sort(key=lambda span: span.start)
+    for span in spans:
+        if not span.parent_id:
+            continue
+        caller = services.get((span.trace_id, span.parent_id))
+        if caller and caller != span.service:
+            yield Message(caller, span.service, span.name)
@@ -1,7 +1,12 @@
 import hashlib
+from functools import lru_cache
 from textwrap import wrap
 from typing import Callable
+from typing import List
 from typing import Optional
+from typing import Sequence
+from typing import Tuple
+from typing import Union
 
 from manim import Arrow
 from manim import BLACK
@@ -9,7 +14,9 @@ from manim import DOWN
 from manim import DR
 from manim import ITALIC
 from manim import LEFT
+from manim import Line
 from manim import Mobject
+from manim import np
 from manim import Polygon
 from manim import Rectangle
 from manim import RIGHT
@@ -18,6 +25,13 @@ from manim import UP
 from manim import VGroup
 from manim import WHITE
 
+from code_video.autoscale import get_bounds
+from code_video.cache import cache_key
+from code_video.cache import LRUCache
+from code_video.layout import Box
+from code_video.layout import LayeredLayout
+from code_video.layout import SpatialIndex
+
 DEFAULT_FONT = "sans-serif"
 
 SHADOW_COLOR = BLACK
@@ -30,6 +44,10 @@ ROUNDED_RADIUS = 0.05
 
 VERTICAL_ARROW_LABEL_BUFF = 0.2
 
+_rendered_text = LRUCache(max_size=512)
+
+_box_templates = LRUCache(max_size=256)
+
 
 class BoxBase(VGroup):
     def __init__(
@@ -48,7 +66,7 @@ class BoxBase(VGroup):
         super().__init__(**kwargs)
         self.bg_color = bg_color
         self.border_color = border_color
-        self.border_padding = (border_padding,)
+        self.border_padding = border_padding
         self.color_palette = color_palette
         self.shadow = shadow
         self.rounded = rounded
@@ -61,32 +79,65 @@ class BoxBase(VGroup):
     def _box(
         self,
         text,
-        border_builder: Callable[[Text], Polygon],
+        border_size: Callable[[Text], Tuple[float, float]],
+        border_builder: Callable[[float, float], Polygon],
     ):
 
         if self.wrap_at:
             text = "\n".join(wrap(text, self.wrap_at))
-        title = Text(text, **self.text_attrs)
+        title = cached_text(text, **self.text_attrs)
 
-        border = border_builder(title)
-        border.set_color(self.border_color)
+        width, height = border_size(title)
         bg_color, bg_opacity = self._color_and_opacity(self.bg_color, text)
-        border.set_fill(color=bg_color, opacity=bg_opacity)
-        if self.rounded:
-            border.round_corners(ROUNDED_RADIUS)
+        border, s_rect = self._border_and_shadow(border_builder, width, height, bg_color, bg_opacity)
         title.move_to(border)
         self.add(border, title)
-        if self.shadow and bg_opacity:
-            s_rect = border.copy()
-            s_rect.set_color(SHADOW_COLOR)
-            shadow_opacity = SHADOW_OPACITY
-            s_rect.set_stroke(width=0)
-            s_rect.set_background_stroke(width=0)
-            s_rect.set_fill(opacity=shadow_opacity)
-            s_rect.scale(1 + SHADOW_SHIFT)
-            s_rect.shift(SHADOW_SHIFT * DR)
+        if s_rect:
             self.add_to_back(s_rect)
 
+    def _border_and_shadow(
+        self,
+        border_builder: Callable[[float, float], Polygon],
+        width: float,
+        height: float,
+        bg_color: str,
+        bg_opacity: float,
+    ) -> Tuple[Polygon, Optional[Polygon]]:
+        """
+        Gets copies of the styled border and shadow, which are built once per distinct box shape and style
+        """
+        key = cache_key(
+            type(self).__name__,
+            round(float(width), 4),
+            round(float(height), 4),
+            str(self.border_color),
+            bg_color,
+            bg_opacity,
+            self.rounded,
+            self.shadow,
+        )
+        templates = _box_templates.get(key)
+        if templates is None:
+            border = border_builder(width, height)
+            border.set_color(self.border_color)
+            border.set_fill(color=bg_color, opacity=bg_opacity)
+            if self.rounded:
+                border.round_corners(ROUNDED_RADIUS)
+            s_rect = None
+            if self.shadow and bg_opacity:
+                s_rect = border.copy()
+                s_rect.set_color(SHADOW_COLOR)
+                s_rect.set_stroke(width=0)
+                s_rect.set_background_stroke(width=0)
+                s_rect.set_fill(opacity=SHADOW_OPACITY)
+                s_rect.scale(1 + SHADOW_SHIFT)
+                s_rect.shift(SHADOW_SHIFT * DR)
+            templates = (border, s_rect)
+            _box_templates.put(key, templates)
+
+        border, s_rect = templates
+        return border.copy(), s_rect.copy() if s_rect else None
+
     def _color_and_opacity(self, value: str, text: str):
         palette = self.color_palette
         if value == "random":
@@ -118,9 +169,11 @@ class TextBox(BoxBase):
         super().__init__(text, text_attrs=text_attrs, **kwargs)
         self._box(
             text=text,
-            border_builder=lambda title: Rectangle(
-                height=_get_text_height(title) + self.border_padding, width=title.get_width() + self.border_padding
+            border_size=lambda title: (
+                title.get_width() + self.border_padding,
+                _get_text_height(title) + self.border_padding,
             ),
+            border_builder=lambda width, height: Rectangle(height=height, width=width),
         )
 
 
@@ -140,13 +193,15 @@ class NoteBox(BoxBase):
             text_attrs["font"] = font
         super().__init__(text, text_attrs=text_attrs, **kwargs)
 
-        def build_border(title: Text):
-            ear_size = title.get_width() * 0.05
-            w = title.get_width() + 0.3 * 2
-            h = title.get_height() + 0.3
+        def build_border(w: float, h: float):
+            ear_size = (w - 0.3 * 2) * 0.05
             return Polygon((0, h, 0), (w - ear_size, h, 0), (w, h - ear_size, 0), (w, 0, 0), (0, 0, 0), (0, h, 0))
 
-        self._box(text=text, border_builder=build_border)
+        self._box(
+            text=text,
+            border_size=lambda title: (title.get_width() + 0.3 * 2, title.get_height() + 0.3),
+            border_builder=build_border,
+        )
 
 
 class Connection(VGroup):
@@ -154,15 +209,32 @@ class Connection(VGroup):
     An arrow connection between two objects
     """
 
-    def __init__(self, source: Mobject, target: Mobject, label: Optional[str] = None, font=DEFAULT_FONT, **kwargs):
+    def __init__(
+        self,
+        source: Mobject,
+        target: Mobject,
+        label: Optional[str] = None,
+        font=DEFAULT_FONT,
+        route: Optional[Sequence[Sequence[float]]] = None,
+        obstacles: Optional[SpatialIndex] = None,
+        **kwargs,
+    ):
         """
         Args:
             source: The source object
             target: The target object
             label: The optional label text to put over the arrow
+            route: The points of an orthogonal path to draw from the source to the target, instead of
+                a straight arrow between facing edges
+            obstacles: Anything the label should avoid overlapping when following a route
         """
         super().__init__(**kwargs)
         self.font = font
+        self.label_text: Optional[Text] = None
+        if route is not None:
+            self._route(route, label, obstacles)
+            return
+
         label_direction = UP
         label_buff = 0
 
@@ -187,10 +259,142 @@ class Connection(VGroup):
 
         self.add(arrow)
         if label:
-            text = Text(label, font=self.font, size=0.5, slant=ITALIC)
+            text = cached_text(label, font=self.font, size=0.5, slant=ITALIC)
             text.next_to(arrow, direction=label_direction, buff=label_buff)
+            self.label_text = text
             self.add(text)
 
+    def _route(self, route: Sequence[Sequence[float]], label: Optional[str], obstacles: Optional[SpatialIndex]):
+        points = [np.array((point[0], point[1], 0)) for point in route]
+        if len(points) < 2:
+            raise ValueError("Unable to connect")
+
+        for start, end in zip(points[:-2], points[1:-1]):
+            self.add(Line(start, end))
+        self.add(Arrow(start=points[-2], end=points[-1], buff=0, max_tip_length_to_length_ratio=0.5))
+
+        if not label:
+            return
+
+        text = cached_text(label, font=self.font, size=0.5, slant=ITALIC)
+        # try the middle of each segment, longest first, until the label is clear of any obstacles
+        segments = sorted(zip(points, points[1:]), key=lambda segment: -np.linalg.norm(segment[1] - segment[0]))
+        for idx, (start, end) in enumerate(segments):
+            if abs(end[1] - start[1]) > abs(end[0] - start[0]):
+                text.next_to((start + end) / 2, direction=RIGHT, buff=VERTICAL_ARROW_LABEL_BUFF)
+            else:
+                text.next_to((start + end) / 2, direction=UP, buff=0)
+            if not obstacles or not obstacles.query(bounding_box(text)):
+                break
+        else:
+            start, end = segments[0]
+            text.next_to((start + end) / 2, direction=UP, buff=0)
+        self.label_text = text
+        self.add(text)
+
+
+class Diagram(VGroup):
+    """
+    A box and arrow diagram that lays out its nodes in layers, flowing top to bottom, with
+    orthogonal arrows routed between them
+    """
+
+    def __init__(self, node_buff: float = 0.5, layer_buff: float = 1.0, font=DEFAULT_FONT, **kwargs):
+        """
+        Args:
+            node_buff: The horizontal space between nodes
+            layer_buff: The vertical space between layers of nodes
+            font: The font of the edge labels
+        """
+        super().__init__(**kwargs)
+        self.font = font
+        self.layout_engine = LayeredLayout(node_buff=node_buff, layer_buff=layer_buff)
+        self.nodes: List[Mobject] = []
+        self.edges: List[Tuple[Mobject, Mobject, Optional[str]]] = []
+        self.connections: List[Connection] = []
+
+    def add_node(self, node: Union[str, Mobject], **kwargs) -> Mobject:
+        """
+        Adds a node
+
+        Args:
+            node: The node, or the text of a `TextBox` to create
+            kwargs: Arguments for the created `TextBox`
+        """
+        if isinstance(node, str):
+            node = TextBox(node, **kwargs)
+        self.nodes.append(node)
+        self.add(node)
+        return node
+
+    def add_edge(self, source: Mobject, target: Mobject, label: Optional[str] = None) -> "Diagram":
+        """
+        Adds an arrow between two nodes. Edges from a node to itself are not drawn.
+
+        Args:
+            source: The source node
+            target: The target node
+            label: The optional label text to put along the arrow
+        """
+        self.edges.append((source, target, label))
+        return self
+
+    def layout(self) -> "Diagram":
+        """
+        Positions the nodes and builds the connections between them, centered on the origin
+        """
+        index = {id(node): idx for idx, node in enumerate(self.nodes)}
+        centers, routes = self.layout_engine.solve(
+            [(node.width, node.height) for node in self.nodes],
+            [(index[id(source)], index[id(target)]) for source, target, _ in self.edges],
+        )
+        obstacles = SpatialIndex()
+        for node, center in zip(self.nodes, centers):
+            node.move_to((center[0], center[1], 0))
+            obstacles.insert(bounding_box(node), id(node))
+
+        self.remove(*self.connections)
+        self.connections = []
+        for (source, target, label), route in zip(self.edges, routes):
+            if route is None:
+                continue
+            connection = Connection(source, target, label, font=self.font, route=route, obstacles=obstacles)
+            if connection.label_text:
+                obstacles.insert(bounding_box(connection.label_text), id(connection.label_text))
+            self.connections.append(connection)
+        self.add(*self.connections)
+        self.center()
+        return self
+
+
+def bounding_box(mobject: Mobject) -> Box:
+    """
+    Gets the `(min_x, min_y, max_x, max_y)` bounds of a mobject in a single pass over its points
+    """
+    (min_x, min_y, _), (max_x, max_y, _) = get_bounds(mobject).box
+    return min_x, min_y, max_x, max_y
+
+
+def cached_text(text: str, **kwargs) -> Text:
+    """
+    Creates a `Text`, reusing the Pango layout and SVG parsing of any identical text and settings
+
+    Args:
+        text: The text to display
+        kwargs: Any `Text` arguments, such as `font`, `size` and `slant`
+    """
+    key = cache_key(text, sorted(kwargs.items()))
+    template = _rendered_text.get(key)
+    if template is None:
+        template = Text(text, **kwargs)
+        _rendered_text.put(key, template)
+    return template.copy()
+
+
+@lru_cache(maxsize=64)
+def _font_line_height(font: str) -> float:
+    return Text("Ay", font=font).get_height()
+
 
 def _get_text_height(text: Text) -> float:
-    return max(Text("Ay", font=text.font).get_height(), text.get_height())
+    return max(_font_line_height(text.font), text.get_height())
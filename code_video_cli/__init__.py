@@ -1,10 +1,28 @@
 import argparse
+import importlib
+import os
 import sys
 
 config = {}
 
+# commands of our own, anything else is passed on to manim
+COMMANDS = {
+    "batch": "code_video_cli.batch",
+    "index": "code_video_cli.index",
+    "serve": "code_video_cli.serve",
+    "watch": "code_video_cli.watch",
+}
+
 
 def main():
+    if _submit_to_daemon():
+        return
+
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        command = importlib.import_module(COMMANDS[sys.argv[1]])
+        command.main(sys.argv[2:])
+        return
+
     parser = argparse.ArgumentParser()
     parser.add_argument(
         "--slides",
@@ -12,15 +30,23 @@ def main():
         const=True,
         help="Automatically open the videos as fullscreen slides once its done",
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        help="Render the sections of each CodeScene in this many processes",
+    )
     args, extra = parser.parse_known_args(sys.argv[1:])
     sys.argv = [sys.argv[0].replace("codevidgen", "manim")] + extra
 
     from manim.__main__ import main as manim_main
     config["show_slides"] = args.slides
+    config["section_workers"] = args.jobs
     config["slide_stops"] = {}
     manim_main()
     if args.slides:
+        # pyglet loads its windowing and OpenGL bindings on import, so only do it once slides are shown
         from code_video.player import VideoPlayer
+
         partial_files = config["slide_videos"]
         pauses = config["slide_stops"]
         movie_file_path = config["movie_file_path"]
@@ -42,5 +68,20 @@ def main():
         player.play()
 
 
+def _submit_to_daemon() -> bool:
+    # hands the command to a running `codevidgen serve`, apart from commands that run their own process
+    from code_video_cli import serve
+
+    local = sys.argv[1:2] in (["serve"], ["watch"]) or "--slides" in sys.argv
+    if local or os.environ.get(serve.NO_DAEMON_ENV):
+        return False
+    status = serve.submit(sys.argv[1:])
+    if status is None:
+        return False
+    if status:
+        sys.exit(status)
+    return True
+
+
 if __name__ == '__main__':
     main()
\ No newline at end of file
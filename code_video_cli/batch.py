@@ -0,0 +1,150 @@
+import argparse
+import glob
+import hashlib
+import importlib.util
+import os
+import sys
+import time
+from concurrent.futures import as_completed
+from concurrent.futures import ProcessPoolExecutor
+from types import ModuleType
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+
+from manim import tempconfig
+from manim.constants import QUALITIES
+from manim.utils.module_ops import get_scene_classes_from_module
+
+# the manim quality names by their command line flag
+QUALITY_FLAGS = {quality["flag"]: name for name, quality in QUALITIES.items() if quality["flag"]}
+
+# modules of scene files already loaded by this process, by absolute path
+_modules: Dict[str, ModuleType] = {}
+
+
+class SceneJob(NamedTuple):
+    path: str
+    scene: str
+
+
+class SceneResult(NamedTuple):
+    job: SceneJob
+    seconds: float
+    error: Optional[str]
+
+
+def main(argv: List[str]):
+    parser = argparse.ArgumentParser(
+        prog="codevidgen batch", description="Renders every scene in the matching files in a pool of processes"
+    )
+    parser.add_argument("patterns", nargs="+", help="Glob patterns of the scene files, like examples/*.py")
+    parser.add_argument("-j", "--jobs", type=int, help="The number of processes, defaults to the number of CPUs")
+    parser.add_argument("-q", "--quality", choices=sorted(QUALITY_FLAGS), help="The render quality, as in manim")
+    parser.add_argument("--media_dir", help="The directory to write the videos to, as in manim")
+    args = parser.parse_args(argv)
+
+    files = sorted({path for pattern in args.patterns for path in glob.glob(pattern, recursive=True)})
+    files = [path for path in files if path.endswith(".py")]
+    if not files:
+        parser.error("No scene files match the patterns")
+
+    options = render_options(args.quality, args.media_dir)
+    start = time.perf_counter()
+    results: List[SceneResult] = []
+    # the processes live for the whole batch, so scenes reuse the code, text and lexer caches of earlier scenes
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        jobs = [job for found in executor.map(find_scenes, files) for job in found]
+        futures = [executor.submit(render_scene, job, options) for job in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            job = result.job
+            status = f"failed: {result.error}" if result.error else "done"
+            print(f"[{len(results)}/{len(jobs)}] {job.path} {job.scene} {status} in {result.seconds:.2f}s")
+    elapsed = time.perf_counter() - start
+
+    print()
+    for result in sorted(results, key=lambda result: result.seconds, reverse=True):
+        status = "FAILED" if result.error else "ok"
+        print(f"{result.seconds:9.2f}s  {status:6}  {result.job.path} {result.job.scene}")
+    failed = sum(1 for result in results if result.error)
+    total = sum(result.seconds for result in results)
+    print(
+        f"Rendered {len(results) - failed} of {len(results)} scenes in {elapsed:.2f}s "
+        f"({total:.2f}s of rendering, {total / elapsed if elapsed else 0:.1f}x parallel)"
+    )
+    if failed:
+        sys.exit(1)
+
+
+def render_options(quality: Optional[str] = None, media_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Gets the manim configuration values for command line options
+
+    Args:
+        quality: The quality flag, like `l` for low quality
+        media_dir: The directory to write the videos to
+    """
+    options: Dict[str, Any] = {}
+    if quality:
+        settings = QUALITIES[QUALITY_FLAGS[quality]]
+        options.update(pixel_height=settings["pixel_height"], pixel_width=settings["pixel_width"])
+        options.update(frame_rate=settings["frame_rate"])
+    if media_dir:
+        options["media_dir"] = media_dir
+    return options
+
+
+def find_scenes(path: str) -> List[SceneJob]:
+    """
+    Finds the scene classes defined in a file
+
+    Args:
+        path: The python file path
+    """
+    return [SceneJob(path, scene.__name__) for scene in get_scene_classes_from_module(load_module(path))]
+
+
+def render_scene(job: SceneJob, options: Dict[str, Any]) -> SceneResult:
+    """
+    Renders a scene in this process, with the current manim configuration and the given changes to it
+
+    Args:
+        job: The file and name of the scene
+        options: The manim configuration values to change
+    """
+    start = time.perf_counter()
+    try:
+        scene_class = getattr(load_module(job.path), job.scene)
+        with tempconfig(dict(options, input_file=job.path)):
+            scene_class().render()
+    except Exception as e:  # pylint: disable=broad-except
+        return SceneResult(job, time.perf_counter() - start, f"{type(e).__name__}: {e}")
+    return SceneResult(job, time.perf_counter() - start, None)
+
+
+def load_module(path: str) -> ModuleType:
+    """
+    Imports a scene file, once per process
+
+    Args:
+        path: The python file path
+    """
+    path = os.path.abspath(path)
+    module = _modules.get(path)
+    if module is None:
+        # named after the whole path, so scene files with the same name in different directories don't collide
+        name = f"{os.path.splitext(os.path.basename(path))[0]}_{hashlib.sha1(path.encode()).hexdigest()[:8]}"
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        # like manim, let scenes import the modules next to them
+        directory = os.path.dirname(path)
+        if directory not in sys.path:
+            sys.path.insert(0, directory)
+        spec.loader.exec_module(module)
+        _modules[path] = module
+    return module
@@ -0,0 +1,37 @@
+import argparse
+import os
+import time
+from typing import List
+
+from code_video.manifest import DEFAULT_EXCLUDES
+from code_video.manifest import DEFAULT_MANIFEST
+from code_video.manifest import Manifest
+
+
+def main(argv: List[str]):
+    parser = argparse.ArgumentParser(
+        prog="codevidgen index", description="Indexes the walkthrough comments of every source file in a directory"
+    )
+    parser.add_argument("root", nargs="?", default=".", help="The directory to index")
+    parser.add_argument("-o", "--output", help=f"The manifest file, defaults to {DEFAULT_MANIFEST} in the root")
+    parser.add_argument("-j", "--jobs", type=int, help="The number of processes, defaults to the number of CPUs")
+    parser.add_argument(
+        "--exclude", action="append", default=[], help="A file or directory name pattern to skip, can be repeated"
+    )
+    args = parser.parse_args(argv)
+
+    output = args.output or os.path.join(args.root, DEFAULT_MANIFEST)
+    manifest = Manifest(args.root)
+    if os.path.exists(output):
+        previous = Manifest.load(output)
+        if previous.root == manifest.root:
+            manifest = previous
+
+    excludes = list(DEFAULT_EXCLUDES) + args.exclude + [os.path.basename(output)]
+    start = time.perf_counter()
+    stats = manifest.update(workers=args.jobs, excludes=excludes)
+    manifest.save(output)
+    print(
+        f"Indexed {len(manifest.files)} files in {time.perf_counter() - start:.2f}s: {stats.parsed} parsed, "
+        f"{stats.unchanged} unchanged, {stats.skipped} skipped"
+    )
@@ -0,0 +1,175 @@
+"""
+A long lived render process for `codevidgen serve`. It imports manim and code_video and warms up the
+fonts once, then runs each job in a fork of itself, so jobs start with everything loaded and can't
+leave any state behind for the next one. The output of a job is streamed back to the client as it
+is written.
+"""
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+import traceback
+from tempfile import TemporaryDirectory
+from typing import List
+from typing import Optional
+
+from code_video.cache import get_cache_dir
+
+SOCKET_ENV = "CODEVIDGEN_SOCKET"
+
+# set to run codevidgen in its own process even when a daemon is running
+NO_DAEMON_ENV = "CODEVIDGEN_NO_DAEMON"
+
+# ends the output of a job, followed by its exit status
+_EXIT_MARKER = b"\0codevidgen-exit "
+
+_CHUNK_SIZE = 64 * 1024
+
+
+def get_socket_path() -> str:
+    """
+    Gets the path of the daemon's Unix socket, overridable with the `CODEVIDGEN_SOCKET` environment
+    variable
+    """
+    return os.environ.get(SOCKET_ENV) or os.path.join(get_cache_dir(), "serve.sock")
+
+
+def main(argv: List[str]):
+    parser = argparse.ArgumentParser(
+        prog="codevidgen serve",
+        description="Keeps a warmed up render process running, which codevidgen submits its renders to",
+    )
+    parser.add_argument("--socket", default=get_socket_path(), help="The Unix socket to listen on")
+    args = parser.parse_args(argv)
+
+    existing = _connect(args.socket)
+    if existing:
+        existing.close()
+        parser.error(f"Already serving on {args.socket}")
+    if os.path.exists(args.socket):
+        os.remove(args.socket)
+    os.makedirs(os.path.dirname(os.path.abspath(args.socket)), exist_ok=True)
+
+    warm_up()
+    with _Server(args.socket, _Handler) as server:
+        print(f"Serving renders on {args.socket}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(args.socket)
+
+
+def submit(argv: List[str], path: Optional[str] = None) -> Optional[int]:
+    """
+    Runs a codevidgen command in a running `codevidgen serve`, streaming its output to this
+    process's standard output
+
+    Args:
+        argv: The codevidgen arguments
+        path: The daemon's socket, defaults to `get_socket_path()`
+
+    Returns:
+        The exit status of the command, or `None` if no daemon is running
+    """
+    connection = _connect(path or get_socket_path())
+    if connection is None:
+        return None
+
+    with connection:
+        job = dict(argv=argv, cwd=os.getcwd(), env=dict(os.environ))
+        connection.sendall(json.dumps(job).encode() + b"\n")
+        out = sys.stdout.buffer
+        # holds back the end of the output until it's known not to be the exit marker
+        tail = b""
+        for chunk in iter(lambda: connection.recv(_CHUNK_SIZE), b""):
+            tail += chunk
+            keep = len(_EXIT_MARKER) + 8
+            if len(tail) > keep:
+                out.write(tail[:-keep])
+                out.flush()
+                tail = tail[-keep:]
+
+    output, marker, status = tail.partition(_EXIT_MARKER)
+    out.write(output)
+    out.flush()
+    return int(status) if marker else 1
+
+
+class _Server(socketserver.ForkingMixIn, socketserver.UnixStreamServer):
+    pass
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        # runs in a fork of the daemon, which exits once the job is done
+        job = json.loads(self.rfile.readline())
+        status = _run(job, self.connection)
+        self.connection.sendall(_EXIT_MARKER + str(status).encode() + b"\n")
+
+
+def _run(job: dict, connection: socket.socket) -> int:
+    from manim import config as manim_config
+    from manim._config.utils import make_config_parser
+
+    import code_video_cli
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os.dup2(connection.fileno(), 1)
+    os.dup2(connection.fileno(), 2)
+    sys.stdout.reconfigure(line_buffering=True)
+    sys.stderr.reconfigure(line_buffering=True)
+
+    os.chdir(job["cwd"])
+    os.environ.clear()
+    os.environ.update(job["env"])
+    os.environ[NO_DAEMON_ENV] = "1"
+    # picks up the manim.cfg of the client's directory
+    manim_config.digest_parser(make_config_parser())
+    sys.argv = ["codevidgen"] + job["argv"]
+    try:
+        code_video_cli.main()
+        status = 0
+    except SystemExit as e:
+        status = e.code if isinstance(e.code, int) else int(e.code is not None)
+    except Exception:  # pylint: disable=broad-except
+        traceback.print_exc()
+        status = 1
+    sys.stdout.flush()
+    sys.stderr.flush()
+    return status
+
+
+def _connect(path: str) -> Optional[socket.socket]:
+    if not os.path.exists(path):
+        return None
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(path)
+    except OSError:
+        connection.close()
+        return None
+    return connection
+
+
+def warm_up():
+    """
+    Does the imports and font lookups every render pays for, so the processes forked afterwards
+    start with them done
+    """
+    import librosa  # noqa: F401
+    from manim import tempconfig
+    from manim import Text
+
+    from code_video import scene  # noqa: F401
+    from code_video import sequence  # noqa: F401
+    from code_video.widgets import DEFAULT_FONT
+    from code_video_cli import batch  # noqa: F401
+
+    with TemporaryDirectory() as media_dir:
+        with tempconfig({"media_dir": media_dir}):
+            Text("codevidgen", font=DEFAULT_FONT)
@@ -0,0 +1,145 @@
+"""
+`codevidgen watch` renders the scenes of a file, then renders them again whenever a file they read
+changes. Every render runs in a fork of a process that has already imported manim and code_video,
+and only the scenes that read a changed file are rendered again.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import traceback
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from manim import tempconfig
+
+from code_video.cache import file_key
+from code_video_cli import batch
+from code_video_cli import serve
+
+Key = Optional[Tuple[str, int, int]]
+
+
+def main(argv: List[str]):
+    parser = argparse.ArgumentParser(
+        prog="codevidgen watch", description="Renders the scenes of a file again whenever a file they read changes"
+    )
+    parser.add_argument("path", help="The scene file")
+    parser.add_argument("scenes", nargs="*", help="The scenes to render, defaults to all scenes in the file")
+    parser.add_argument("-q", "--quality", choices=sorted(batch.QUALITY_FLAGS), help="The render quality")
+    parser.add_argument("--media_dir", help="The directory to write the videos to, as in manim")
+    parser.add_argument("--interval", type=float, default=0.2, help="The seconds between checks for changes")
+    args = parser.parse_args(argv)
+
+    options = batch.render_options(args.quality, args.media_dir)
+    path = os.path.abspath(args.path)
+    serve.warm_up()
+
+    # the scene file is always watched, so saving it after it failed to import finds its scenes again
+    scene_file = _key(path)
+    scenes = _find_scenes(path, args.scenes) or []
+    # the files each scene read, with their keys as of when they were read
+    dependencies: Dict[str, Dict[str, Key]] = {}
+    for scene in scenes:
+        dependencies[scene] = _render(path, scene, options, None)
+
+    watched = {path, *(dependency for found in dependencies.values() for dependency in found)}
+    print(f"Watching {len(watched)} files for changes")
+    try:
+        while True:
+            time.sleep(args.interval)
+            current = _key(path)
+            if current != scene_file:
+                # keyed before the scenes are found, like the files a render reads
+                scene_file = current
+                discovered = _find_scenes(path, args.scenes)
+                if discovered is None:
+                    # keeps rendering the scenes found before until the file imports again
+                    continue
+                scenes = discovered
+                dependencies = {scene: found for scene, found in dependencies.items() if scene in scenes}
+                affected = scenes
+            else:
+                keys = {dependency: _key(dependency) for found in dependencies.values() for dependency in found}
+                affected = [
+                    scene
+                    for scene in scenes
+                    if any(
+                        keys[dependency] != key
+                        for dependency, key in dependencies.get(scene, {}).items()
+                        if dependency != path
+                    )
+                ]
+            for scene in affected:
+                dependencies[scene] = _render(path, scene, options, dependencies.get(scene))
+    except KeyboardInterrupt:
+        pass
+
+
+def _find_scenes(path: str, names: List[str]) -> Optional[List[str]]:
+    # gets the scenes to render, or None if the scene file failed to import
+    found = _in_fork(lambda: [job.scene for job in batch.find_scenes(path)])
+    if found is None:
+        print(f"Failed to find the scenes in {path}")
+        return None
+    return [name for name in found if not names or name in names]
+
+
+def _render(path: str, scene: str, options: Dict[str, Any], previous: Optional[Dict[str, Key]]) -> Dict[str, Key]:
+    # renders a scene and gets the files it read, keeping the previous ones if the render failed. Files
+    # are keyed before they are read, so any change saved while rendering causes another render.
+    before = {dependency: _key(dependency) for dependency in {path, *(previous or ())}}
+    start = time.perf_counter()
+    result = _in_fork(lambda: _render_scene(path, scene, options))
+    if result is None:
+        print(f"{scene} failed in {time.perf_counter() - start:.2f}s")
+        return before
+    print(f"Rendered {scene} in {time.perf_counter() - start:.2f}s")
+    return {path: before[path], **{dependency: tuple(key) if key else None for dependency, key in result}}
+
+
+def _render_scene(path: str, scene: str, options: Dict[str, Any]) -> List[Tuple[str, Key]]:
+    scene_class = getattr(batch.load_module(path), scene)
+    with tempconfig(dict(options, input_file=path)):
+        instance = scene_class()
+        instance.render()
+    return sorted(getattr(instance, "dependencies", {}).items())
+
+
+def _in_fork(function: Callable[[], Any]) -> Any:
+    # runs a function in a fork, so it sees the files as they are now, and returns its result as json
+    sys.stdout.flush()
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read)
+        status = 0
+        try:
+            result = function()
+        except BaseException:  # pylint: disable=broad-except
+            traceback.print_exc()
+            result, status = None, 1
+        with os.fdopen(write, "w") as f:
+            json.dump(result, f)
+        # exiting skips the interpreter's cleanup, so flush what is buffered for a piped output
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(status)
+
+    os.close(write)
+    with os.fdopen(read) as f:
+        output = f.read()
+    os.waitpid(pid, 0)
+    return json.loads(output) if output else None
+
+
+def _key(path: str) -> Key:
+    try:
+        return file_key(path)
+    except OSError:
+        return None
@@ -0,0 +1,29 @@
+from manim import Create
+from manim import FadeIn
+from manim import Scene
+
+from code_video import AutoScaled
+from code_video import Diagram
+
+
+class DiagramScene(Scene):
+    def construct(self):
+        diagram = Diagram()
+        browser = diagram.add_node("Browser", shadow=False)
+        web = diagram.add_node("Web", shadow=False)
+        app = diagram.add_node("App", shadow=False)
+        cache = diagram.add_node("Cache", shadow=False)
+        db = diagram.add_node("Database", shadow=False)
+
+        diagram.add_edge(browser, web, "HTTP")
+        diagram.add_edge(web, app, "WSGI")
+        diagram.add_edge(app, cache, "Lookup")
+        diagram.add_edge(app, db, "Query")
+        diagram.add_edge(web, db, "Sessions")
+        diagram = AutoScaled(diagram.layout())
+
+        self.play(*[FadeIn(node) for node in diagram.nodes])
+        for connection in diagram.connections:
+            self.play(Create(connection))
+
+        self.wait(5)